@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_CONTENT_TYPES = (
+    "text/",
+    "application/json",
+    "application/msgpack",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def get_accepted_encodings(header):
+    encodings = set()
+    for item in header.split(","):
+        encoding, _, params = item.strip().partition(";")
+        quality = params.strip().partition("q=")[2]
+        try:
+            if quality and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(encoding.strip().lower())
+    return encodings
+
+
+def brotli_compress_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with brotli if the client accepts it, else gzip.
+
+    Responses shorter than COMPRESSION_MIN_LENGTH are sent as is; streaming
+    responses are compressed chunk by chunk since their length is unknown.
+    """
+
+    def _get_encoding(self, request):
+        accepted = get_accepted_encodings(
+            request.META.get("HTTP_ACCEPT_ENCODING", "")
+        )
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _compress(self, content, encoding):
+        if encoding == "br":
+            return brotli.compress(
+                content, quality=settings.COMPRESSION_BROTLI_QUALITY
+            )
+        return compress_string(content)
+
+    def _compress_sequence(self, sequence, encoding):
+        if encoding == "br":
+            return brotli_compress_sequence(
+                sequence, settings.COMPRESSION_BROTLI_QUALITY
+            )
+        return compress_sequence(sequence)
+
+    def process_response(self, request, response):
+        if not response.streaming and (
+            len(response.content) < settings.COMPRESSION_MIN_LENGTH
+        ):
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+        if not response.get("Content-Type", "").startswith(
+            COMPRESSIBLE_CONTENT_TYPES
+        ):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = self._get_encoding(request)
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = self._compress_sequence(
+                response.streaming_content, encoding
+            )
+            del response.headers["Content-Length"]
+        else:
+            compressed_content = self._compress(response.content, encoding)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers["Content-Length"] = str(len(response.content))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -1,5 +1,6 @@
 import os
 import sys
+from importlib.util import find_spec
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -39,6 +40,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "foodgram.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -79,9 +81,23 @@ DATABASES = {
     }
 }
 
+# Shared by the web and image workers: cache versions bumped in one
+# process must reach the others.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL", "redis://redis:6379/0"),
+    }
+}
+
 if "test" in sys.argv:
     DATABASES["default"]["ENGINE"] = "django.db.backends.sqlite3"
     DATABASES["default"]["NAME"] = ":memory:"
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }
+    }
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -115,10 +131,30 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+FILE_UPLOAD_HANDLERS = [
+    "foodgram.uploadhandlers.MaxSizeUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+FILE_UPLOAD_MAX_SIZE = int(os.getenv("FILE_UPLOAD_MAX_SIZE", 10 * 1024 ** 2))
+IMAGE_UPLOAD_MAX_PIXELS = int(
+    os.getenv("IMAGE_UPLOAD_MAX_PIXELS", 40 * 1000 ** 2)
+)
+
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "foodgram.renderers.ORJSONRenderer",
+        "foodgram.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "foodgram.parsers.ORJSONParser",
+        "foodgram.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
@@ -127,6 +163,14 @@ REST_FRAMEWORK = {
     ],
 }
 
+if find_spec("msgpack") is None:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].remove(
+        "foodgram.renderers.MessagePackRenderer"
+    )
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"].remove(
+        "foodgram.parsers.MessagePackParser"
+    )
+
 DJOSER = {
     "SERIALIZERS": {
         "user": "users.serializers.CustomUserSerializer",
@@ -141,3 +185,13 @@ DJOSER = {
 }
 
 PS = 6
+
+COMPRESSION_MIN_LENGTH = int(os.getenv("COMPRESSION_MIN_LENGTH", 1024))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
+
+RECIPE_SEARCH_BACKEND = os.getenv("RECIPE_SEARCH_BACKEND")
+
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", 2))
+IMAGE_VARIANT_POLL_INTERVAL = float(
+    os.getenv("IMAGE_VARIANT_POLL_INTERVAL", 2)
+)
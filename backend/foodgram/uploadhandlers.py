@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """Abort a multipart upload once a file grows past FILE_UPLOAD_MAX_SIZE.
+
+    It goes before the handler that stores the data, so an oversized file
+    is rejected while it is streamed and never written out in full.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.FILE_UPLOAD_MAX_SIZE:
+            raise MultiPartParserError(
+                f"Файл {self.file_name} больше "
+                f"{settings.FILE_UPLOAD_MAX_SIZE} байт"
+            )
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
@@ -1,7 +1,10 @@
 from django.contrib import admin
 
+from .documents import update_recipe_document
+from .images import enqueue_image_variants
 from .models import (Favorite, Ingredient, IngredientAmount, Recipe,
-                     ShoppingCart, Tag)
+                     RecipeImageJob, ShoppingCart, Tag)
+from .search import update_recipe_search_index
 
 
 @admin.register(Tag)
@@ -24,17 +27,15 @@ class IngredientAdmin(admin.ModelAdmin):
     list_filter = ("name",)
 
 
-@admin.register(IngredientAmount)
-class IngredientAmountAdmin(admin.ModelAdmin):
-    list_display = (
-        "pk",
-        "ingredient",
-        "amount",
-    )
+class IngredientAmountInline(admin.TabularInline):
+    model = IngredientAmount
+    min_num = 1
+    extra = 0
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
+    inlines = (IngredientAmountInline,)
     list_display = (
         "name",
         "author",
@@ -46,8 +47,22 @@ class RecipeAdmin(admin.ModelAdmin):
         "tags",
     )
 
+    readonly_fields = ("favorites_count",)
+
+    @admin.display(
+        description="В избранном",
+        ordering="favorites_count",
+    )
     def count_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        update_recipe_document(form.instance)
+        update_recipe_search_index(form.instance)
+        previous_image = getattr(form.initial.get("image"), "name", None)
+        if form.instance.image.name != previous_image:
+            enqueue_image_variants(form.instance)
 
 
 @admin.register(Favorite)
@@ -66,3 +81,15 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         "user",
         "recipe",
     )
+
+
+@admin.register(RecipeImageJob)
+class RecipeImageJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "pk",
+        "recipe",
+        "image",
+        "created_at",
+        "attempts",
+    )
+    readonly_fields = ("error",)
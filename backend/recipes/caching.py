@@ -0,0 +1,212 @@
+import copy
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, Value
+
+from foodgram.renderers import dumps
+from users.models import Subscription
+from .models import Favorite, ShoppingCart, Tag
+
+RECIPE_LIST_CACHE_NAMESPACE = "recipe_list"
+RECIPE_LIST_CACHE_TIMEOUT = 60 * 5
+PERSONAL_RECIPE_FILTERS = ("is_favorited", "is_in_shopping_cart")
+# Favorites move these orders without invalidating the list cache.
+UNCACHED_RECIPE_ORDERINGS = ("popularity", "-popularity")
+MAX_CACHE_KEY_LENGTH = 200
+TAG_MAP_CACHE_NAMESPACE = "tag_map"
+TAG_MAP_CACHE_TIMEOUT = 60 * 60
+
+
+def _get_version_key(namespace, user_id=None):
+    if user_id is None:
+        return f"{namespace}:version"
+    return f"{namespace}:version:{user_id}"
+
+
+def get_cache_version(namespace, user_id=None):
+    # Versions never expire, and a lost one is reseeded with a value that
+    # was never used, so entries cached under an older version stay dead.
+    return cache.get_or_set(
+        _get_version_key(namespace, user_id), time.time_ns, timeout=None
+    )
+
+
+def invalidate_cache(namespace, user_id=None):
+    key = _get_version_key(namespace, user_id)
+
+    def bump_version():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+    transaction.on_commit(bump_version)
+
+
+def get_tag_ids_by_slug():
+    version = get_cache_version(TAG_MAP_CACHE_NAMESPACE)
+    key = f"{TAG_MAP_CACHE_NAMESPACE}:{version}"
+    tag_map = cache.get(key)
+    if tag_map is None:
+        tag_map = dict(Tag.objects.values_list("slug", "id"))
+        cache.set(key, tag_map, TAG_MAP_CACHE_TIMEOUT)
+    return tag_map
+
+
+def get_normalized_query(request, ignored_params=()):
+    return urlencode(
+        sorted(
+            (param, value)
+            for param, values in request.query_params.lists()
+            if param not in ignored_params
+            for value in values
+        )
+    )
+
+
+def has_personal_filters(request):
+    return any(
+        request.query_params.get(param) not in (None, "", "0")
+        for param in PERSONAL_RECIPE_FILTERS
+    )
+
+
+def is_recipe_list_cacheable(request):
+    return not (
+        has_personal_filters(request)
+        or request.query_params.get("ordering") in UNCACHED_RECIPE_ORDERINGS
+    )
+
+
+def shorten_cache_key(prefix, suffix):
+    """Hash long key suffixes to stay within memcached's 250 characters."""
+    if len(prefix) + len(suffix) > MAX_CACHE_KEY_LENGTH:
+        suffix = hashlib.md5(suffix.encode()).hexdigest()
+    return f"{prefix}{suffix}"
+
+
+def get_recipe_list_cache_key(request):
+    version = get_cache_version(RECIPE_LIST_CACHE_NAMESPACE)
+    return shorten_cache_key(
+        f"{RECIPE_LIST_CACHE_NAMESPACE}:{version}:",
+        f"{request.build_absolute_uri(request.path)}?"
+        f"{get_normalized_query(request)}",
+    )
+
+
+def _get_recipes(data):
+    if isinstance(data, dict):
+        return data["results"]
+    return data
+
+
+def _get_authors(data):
+    if isinstance(data, dict) and "included" in data:
+        return data["included"].get("authors", [])
+    return [
+        recipe["author"] for recipe in _get_recipes(data) if "author" in recipe
+    ]
+
+
+def strip_recipe_flags(data):
+    data = copy.deepcopy(data)
+    for recipe in _get_recipes(data):
+        for flag in ("is_favorited", "is_in_shopping_cart"):
+            if flag in recipe:
+                recipe[flag] = False
+    for author in _get_authors(data):
+        author["is_subscribed"] = False
+    return data
+
+
+def get_payload_digest(data):
+    return hashlib.md5(dumps(data)).hexdigest()
+
+
+def get_recipe_memberships(data):
+    """Flags set in ``data`` as sorted (kind, id) pairs."""
+    memberships = set()
+    for recipe in _get_recipes(data):
+        if recipe.get("is_favorited"):
+            memberships.add(("favorite", recipe["id"]))
+        if recipe.get("is_in_shopping_cart"):
+            memberships.add(("shopping_cart", recipe["id"]))
+    for author in _get_authors(data):
+        if author.get("is_subscribed"):
+            memberships.add(("subscription", author["id"]))
+    return sorted(memberships)
+
+
+def overlay_recipe_flags(data, user):
+    recipes = _get_recipes(data)
+    if not user.is_authenticated or not recipes:
+        return data
+    recipe_ids = {recipe["id"] for recipe in recipes}
+    authors = _get_authors(data)
+    author_ids = {author["id"] for author in authors}
+    memberships = (
+        Favorite.objects.filter(user=user, recipe_id__in=recipe_ids)
+        .order_by()
+        .annotate(kind=Value("favorite", output_field=CharField()))
+        .values_list("kind", "recipe_id")
+        .union(
+            ShoppingCart.objects.filter(user=user, recipe_id__in=recipe_ids)
+            .order_by()
+            .annotate(kind=Value("shopping_cart", output_field=CharField()))
+            .values_list("kind", "recipe_id"),
+            Subscription.objects.filter(user=user, author_id__in=author_ids)
+            .order_by()
+            .annotate(kind=Value("subscription", output_field=CharField()))
+            .values_list("kind", "author_id"),
+            all=True,
+        )
+    )
+    memberships = set(memberships)
+    for recipe in recipes:
+        if "is_favorited" in recipe:
+            recipe["is_favorited"] = ("favorite", recipe["id"]) in memberships
+        if "is_in_shopping_cart" in recipe:
+            recipe["is_in_shopping_cart"] = (
+                "shopping_cart",
+                recipe["id"],
+            ) in memberships
+    for author in authors:
+        author["is_subscribed"] = (
+            "subscription",
+            author["id"],
+        ) in memberships
+    return data
+
+
+def get_recipe_flags(user, recipe_ids):
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    favorited = set(
+        Favorite.objects.filter(user=user, recipe_id__in=recipe_ids)
+        .order_by()
+        .values_list("recipe_id", flat=True)
+    )
+    in_shopping_cart = set(
+        ShoppingCart.objects.filter(user=user, recipe_id__in=recipe_ids)
+        .order_by()
+        .values_list("recipe_id", flat=True)
+    )
+    subscribed = set(
+        Subscription.objects.filter(
+            user=user, author__recipes__id__in=recipe_ids
+        )
+        .order_by()
+        .values_list("author__recipes__id", flat=True)
+    )
+    return [
+        {
+            "id": recipe_id,
+            "is_favorited": recipe_id in favorited,
+            "is_in_shopping_cart": recipe_id in in_shopping_cart,
+            "author": {"is_subscribed": recipe_id in subscribed},
+        }
+        for recipe_id in recipe_ids
+    ]
@@ -0,0 +1,45 @@
+import hashlib
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import CatalogVersion
+
+
+def get_catalog_version(name):
+    catalog, _ = CatalogVersion.objects.get_or_create(name=name)
+    return catalog
+
+
+def bump_catalog_version(name):
+    updated = CatalogVersion.objects.filter(name=name).update(
+        version=F("version") + 1,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(name=name)
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(
+        "|".join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return quote_etag(digest)
+
+
+def conditional_response(request, get_response, etag=None,
+                         last_modified=None):
+    timestamp = last_modified and int(last_modified.timestamp())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    if response is None:
+        response = get_response()
+    if response.status_code in (200, 304):
+        if etag:
+            response.headers.setdefault("ETag", etag)
+        if timestamp:
+            response.headers.setdefault("Last-Modified", http_date(timestamp))
+    return response
@@ -0,0 +1,179 @@
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Value
+
+from users.models import Subscription
+from .images import build_absolute_image_variants, get_recipe_image_variants
+from .models import (Favorite, IngredientAmount, Recipe, RecipeDocument,
+                     ShoppingCart, Tag)
+
+AUTHOR_FIELDS = (
+    "email",
+    "id",
+    "username",
+    "first_name",
+    "last_name",
+)
+TAG_FIELDS = (
+    "id",
+    "name",
+    "color",
+    "slug",
+)
+INGREDIENT_FIELDS = (
+    "id",
+    "name",
+    "measurement_unit",
+    "amount",
+)
+RECIPE_FIELDS = (
+    "id",
+    "tags",
+    "author",
+    "ingredients",
+    "is_favorited",
+    "is_in_shopping_cart",
+    "name",
+    "image",
+    "image_variants",
+    "text",
+    "cooking_time",
+)
+
+
+def _split_query_param(request, param):
+    return {
+        field.strip()
+        for value in request.query_params.getlist(param)
+        for field in value.split(",")
+        if field.strip()
+    }
+
+
+def get_recipe_fields(request):
+    fields = set(RECIPE_FIELDS)
+    if request is None:
+        return fields
+    selected = _split_query_param(request, "fields")
+    if selected:
+        fields &= selected
+    return fields - _split_query_param(request, "omit") | {"id"}
+
+
+def prefetch_recipe_relations(recipes, fields=RECIPE_FIELDS):
+    if "author" in fields:
+        recipes = recipes.select_related("author")
+    if "image_variants" in fields:
+        recipes = recipes.select_related("image_variants")
+    if "tags" in fields:
+        recipes = recipes.prefetch_related(
+            Prefetch("tags", queryset=Tag.objects.order_by("id"))
+        )
+    if "ingredients" in fields:
+        recipes = recipes.prefetch_related(
+            Prefetch(
+                "ingredients",
+                queryset=IngredientAmount.objects.select_related(
+                    "ingredient"
+                ).order_by("id"),
+            )
+        )
+    return recipes
+
+
+def build_recipe_document(recipe):
+    return {
+        "id": recipe.id,
+        "tags": [
+            {field: getattr(tag, field) for field in TAG_FIELDS}
+            for tag in recipe.tags.all()
+        ],
+        "author": {
+            field: getattr(recipe.author, field) for field in AUTHOR_FIELDS
+        },
+        "ingredients": [
+            {
+                "id": ingredient_amount.id,
+                "name": ingredient_amount.ingredient.name,
+                "measurement_unit": (
+                    ingredient_amount.ingredient.measurement_unit
+                ),
+                "amount": ingredient_amount.amount,
+            }
+            for ingredient_amount in recipe.ingredients.all()
+        ],
+        "name": recipe.name,
+        "image": recipe.image.url if recipe.image else None,
+        "image_variants": get_recipe_image_variants(recipe),
+        "text": recipe.text,
+        "cooking_time": recipe.cooking_time,
+    }
+
+
+def update_recipe_document(recipe):
+    recipe = prefetch_recipe_relations(Recipe.objects).get(pk=recipe.pk)
+    document, _ = RecipeDocument.objects.update_or_create(
+        recipe=recipe,
+        defaults={"data": build_recipe_document(recipe)},
+    )
+    return document
+
+
+def rebuild_recipe_documents(recipes):
+    recipes = list(prefetch_recipe_relations(recipes))
+    with transaction.atomic():
+        RecipeDocument.objects.filter(recipe__in=recipes).delete()
+        RecipeDocument.objects.bulk_create(
+            RecipeDocument(recipe=recipe, data=build_recipe_document(recipe))
+            for recipe in recipes
+        )
+
+
+def get_recipe_documents(user):
+    documents = RecipeDocument.objects.annotate(
+        updated_at=F("recipe__updated_at")
+    )
+    if not user.is_authenticated:
+        return documents.annotate(
+            is_favorited=Value(False),
+            is_in_shopping_cart=Value(False),
+            is_subscribed=Value(False),
+        )
+    return documents.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef("recipe_id"))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef("recipe_id")
+            )
+        ),
+        is_subscribed=Exists(
+            Subscription.objects.filter(
+                user=user, author=OuterRef("recipe__author_id")
+            )
+        ),
+    )
+
+
+def render_recipe_document(document, request):
+    fields = get_recipe_fields(request)
+    data = dict(document.data)
+    data["tags"] = [
+        {field: tag[field] for field in TAG_FIELDS} for tag in data["tags"]
+    ]
+    data["ingredients"] = [
+        {field: ingredient[field] for field in INGREDIENT_FIELDS}
+        for ingredient in data["ingredients"]
+    ]
+    data["author"] = {
+        **{field: data["author"][field] for field in AUTHOR_FIELDS},
+        "is_subscribed": document.is_subscribed,
+    }
+    data["is_favorited"] = document.is_favorited
+    data["is_in_shopping_cart"] = document.is_in_shopping_cart
+    if data["image"] is not None:
+        data["image"] = request.build_absolute_uri(data["image"])
+    data["image_variants"] = build_absolute_image_variants(
+        data.get("image_variants"), request
+    )
+    return {field: data[field] for field in RECIPE_FIELDS if field in fields}
@@ -0,0 +1,226 @@
+from collections import defaultdict
+
+from .documents import (AUTHOR_FIELDS, INGREDIENT_FIELDS, RECIPE_FIELDS,
+                        TAG_FIELDS)
+from .images import (build_absolute_image_variants, get_image_storage,
+                     get_image_variants)
+from .models import IngredientAmount, Recipe
+
+RECIPE_COLUMNS = ("name", "image", "text", "cooking_time")
+FLAG_FIELDS = ("is_favorited", "is_in_shopping_cart")
+IMAGE_FIELDS = ("image", "image_variants")
+VARIANT_COLUMNS = ("source", "data")
+SIDELOAD_QUERY_PARAM = "sideload"
+
+
+def get_recipe_rows(queryset, fields):
+    columns = ["id"]
+    columns += [column for column in RECIPE_COLUMNS if column in fields]
+    columns += [flag for flag in FLAG_FIELDS if flag in fields]
+    if "author" in fields:
+        columns += [f"author__{field}" for field in AUTHOR_FIELDS]
+    if "image_variants" in fields:
+        columns += [f"image_variants__{field}" for field in VARIANT_COLUMNS]
+        if "image" not in fields:
+            columns.append("image")
+    return queryset.prefetch_related(None).values(*columns)
+
+
+def _serialize_image_field(row, field, request):
+    if field == "image_variants":
+        return build_absolute_image_variants(
+            get_image_variants(
+                row["image"],
+                row["image_variants__source"],
+                row["image_variants__data"],
+            ),
+            request,
+        )
+    if not row[field]:
+        return None
+    return request.build_absolute_uri(get_image_storage().url(row[field]))
+
+
+def _get_tags_map(recipe_ids):
+    tags = defaultdict(list)
+    rows = (
+        Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids)
+        .order_by("tag_id")
+        .values_list(
+            "recipe_id", *(f"tag__{field}" for field in TAG_FIELDS)
+        )
+    )
+    for recipe_id, *values in rows:
+        tags[recipe_id].append(dict(zip(TAG_FIELDS, values)))
+    return tags
+
+
+def _get_ingredients_map(recipe_ids):
+    ingredients = defaultdict(list)
+    rows = (
+        IngredientAmount.objects.filter(recipe_id__in=recipe_ids)
+        .order_by("id")
+        .values_list(
+            "recipe_id",
+            "id",
+            "ingredient__name",
+            "ingredient__measurement_unit",
+            "amount",
+        )
+    )
+    for recipe_id, *values in rows:
+        ingredients[recipe_id].append(dict(zip(INGREDIENT_FIELDS, values)))
+    return ingredients
+
+
+def _get_subscribed_author_ids(request):
+    user = request.user
+    if not user.is_authenticated:
+        return set()
+    return set(user.subscribers.values_list("author_id", flat=True))
+
+
+def serialize_recipe_rows(rows, request, fields):
+    rows = list(rows)
+    recipe_ids = [row["id"] for row in rows]
+    tags = _get_tags_map(recipe_ids) if "tags" in fields else None
+    ingredients = (
+        _get_ingredients_map(recipe_ids) if "ingredients" in fields else None
+    )
+    subscribed_author_ids = (
+        _get_subscribed_author_ids(request) if "author" in fields else None
+    )
+    data = []
+    for row in rows:
+        recipe = {}
+        for field in RECIPE_FIELDS:
+            if field not in fields:
+                continue
+            if field == "tags":
+                recipe[field] = tags.get(row["id"], [])
+            elif field == "author":
+                author = {
+                    author_field: row[f"author__{author_field}"]
+                    for author_field in AUTHOR_FIELDS
+                }
+                author["is_subscribed"] = (
+                    author["id"] in subscribed_author_ids
+                )
+                recipe[field] = author
+            elif field == "ingredients":
+                recipe[field] = ingredients.get(row["id"], [])
+            elif field in IMAGE_FIELDS:
+                recipe[field] = _serialize_image_field(row, field, request)
+            else:
+                recipe[field] = row[field]
+        data.append(recipe)
+    return data
+
+
+def _get_tag_refs(recipe_ids):
+    refs = defaultdict(list)
+    included = {}
+    rows = (
+        Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids)
+        .order_by("tag_id")
+        .values_list(
+            "recipe_id", *(f"tag__{field}" for field in TAG_FIELDS)
+        )
+    )
+    for recipe_id, *values in rows:
+        tag = dict(zip(TAG_FIELDS, values))
+        refs[recipe_id].append(tag["id"])
+        included.setdefault(tag["id"], tag)
+    return refs, included
+
+
+def _get_ingredient_refs(recipe_ids):
+    refs = defaultdict(list)
+    included = {}
+    rows = (
+        IngredientAmount.objects.filter(recipe_id__in=recipe_ids)
+        .order_by("id")
+        .values_list(
+            "recipe_id",
+            "id",
+            "amount",
+            "ingredient_id",
+            "ingredient__name",
+            "ingredient__measurement_unit",
+        )
+    )
+    for recipe_id, amount_id, amount, ingredient_id, *values in rows:
+        refs[recipe_id].append(
+            {"id": amount_id, "ingredient": ingredient_id, "amount": amount}
+        )
+        if ingredient_id not in included:
+            included[ingredient_id] = dict(
+                zip(INGREDIENT_FIELDS, (ingredient_id, *values))
+            )
+    return refs, included
+
+
+def _include_author(row, authors, subscribed_author_ids):
+    author_id = row["author__id"]
+    if author_id not in authors:
+        author = {
+            author_field: row[f"author__{author_field}"]
+            for author_field in AUTHOR_FIELDS
+        }
+        author["is_subscribed"] = author_id in subscribed_author_ids
+        authors[author_id] = author
+    return author_id
+
+
+def _serialize_sideloaded_row(row, request, fields, tag_refs, ingredient_refs,
+                              subscribed_author_ids, included):
+    recipe = {}
+    for field in RECIPE_FIELDS:
+        if field not in fields:
+            continue
+        if field == "tags":
+            recipe[field] = tag_refs.get(row["id"], [])
+        elif field == "author":
+            recipe[field] = _include_author(
+                row, included["authors"], subscribed_author_ids
+            )
+        elif field == "ingredients":
+            recipe[field] = ingredient_refs.get(row["id"], [])
+        elif field in IMAGE_FIELDS:
+            recipe[field] = _serialize_image_field(row, field, request)
+        else:
+            recipe[field] = row[field]
+    return recipe
+
+
+def serialize_sideloaded_recipe_rows(rows, request, fields):
+    """Serialize rows with authors, tags and ingredients side-loaded.
+
+    Recipes reference related objects by id; each distinct object is
+    rendered once in the returned ``included`` mapping. Recipe ingredients
+    keep their amount next to the ingredient id.
+    """
+    rows = list(rows)
+    recipe_ids = [row["id"] for row in rows]
+    included = {}
+    tag_refs = ingredient_refs = subscribed_author_ids = None
+    if "tags" in fields:
+        tag_refs, included["tags"] = _get_tag_refs(recipe_ids)
+    if "ingredients" in fields:
+        ingredient_refs, included["ingredients"] = _get_ingredient_refs(
+            recipe_ids
+        )
+    if "author" in fields:
+        subscribed_author_ids = _get_subscribed_author_ids(request)
+        included["authors"] = {}
+    data = [
+        _serialize_sideloaded_row(
+            row, request, fields, tag_refs, ingredient_refs,
+            subscribed_author_ids, included,
+        )
+        for row in rows
+    ]
+    return data, {
+        section: list(objects.values())
+        for section, objects in included.items()
+    }
@@ -0,0 +1,47 @@
+from users.models import Subscription
+from .models import FeedEntry, Recipe
+
+FEED_BATCH_SIZE = 1000
+
+
+def fan_out_recipe(recipe):
+    """Put a new recipe into the timeline of every subscriber."""
+    subscriber_ids = Subscription.objects.filter(
+        author_id=recipe.author_id
+    ).values_list("user_id", flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe.id,
+                author_id=recipe.author_id,
+            )
+            for user_id in subscriber_ids.iterator()
+        ),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_feed(user_id, author_id):
+    """Copy existing recipes of a followed author into the timeline."""
+    recipe_ids = Recipe.objects.filter(author_id=author_id).values_list(
+        "id", flat=True
+    )
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+            )
+            for recipe_id in recipe_ids.iterator()
+        ),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune_feed(user_id, author_id):
+    """Drop recipes of an unfollowed author from the timeline."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+INVALID_KEY_ERRORS = (TypeError, ValueError, DjangoValidationError)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    def to_internal_value(self, data):
+        keys = data if isinstance(data, (list, tuple)) else ()
+        with self.child_relation.preloaded(keys):
+            return super().to_internal_value(data)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField that resolves a batch of keys in one query.
+
+    Inside ``preloaded(keys)`` the objects for all the keys are loaded with
+    a single IN query and each value is looked up in memory; the error
+    messages are the same as PrimaryKeyRelatedField gives. With many=True
+    the whole list is preloaded.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._objects = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def _to_pk(self, data):
+        if isinstance(data, bool):
+            raise TypeError
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        return self.get_queryset().model._meta.pk.to_python(data)
+
+    @contextmanager
+    def preloaded(self, keys):
+        pks = set()
+        for key in keys:
+            try:
+                pks.add(self._to_pk(key))
+            except (*INVALID_KEY_ERRORS, serializers.ValidationError):
+                continue
+        self._objects = self.get_queryset().in_bulk(pks)
+        try:
+            yield
+        finally:
+            self._objects = None
+
+    def to_internal_value(self, data):
+        if self._objects is None:
+            return super().to_internal_value(data)
+        try:
+            pk = self._to_pk(data)
+        except INVALID_KEY_ERRORS:
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if pk not in self._objects:
+            self.fail("does_not_exist", pk_value=data)
+        return self._objects[pk]
+
+
+class ImageUploadField(serializers.ImageField):
+    """Image taken either as a multipart file or as a base64 data URI.
+
+    Multipart files are streamed to a temporary file by the upload
+    handlers. Only the image header is parsed: the size, the format and
+    the pixel count are checked before any pixel data is decoded, so a
+    decompression bomb is rejected without being expanded.
+    """
+
+    FORMATS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+    default_error_messages = {
+        "invalid_base64": "Картинка в base64 повреждена.",
+        "too_large": "Размер картинки больше {max_size} байт.",
+        "too_many_pixels": "В картинке больше {max_pixels} пикселей.",
+        "invalid_format": "Картинка должна быть в формате JPEG, PNG, GIF "
+        "или WebP.",
+    }
+
+    def _fail_too_large(self):
+        self.fail("too_large", max_size=settings.FILE_UPLOAD_MAX_SIZE)
+
+    def _decode_base64(self, data):
+        data = data.partition(";base64,")[2] or data
+        if len(data) > (settings.FILE_UPLOAD_MAX_SIZE + 2) // 3 * 4:
+            self._fail_too_large()
+        try:
+            content = base64.b64decode(data, validate=True)
+        except (binascii.Error, ValueError):
+            self.fail("invalid_base64")
+        return SimpleUploadedFile("image", content)
+
+    def _check_image(self, file):
+        try:
+            image = Image.open(file)
+        except Image.DecompressionBombError:
+            self.fail(
+                "too_many_pixels",
+                max_pixels=settings.IMAGE_UPLOAD_MAX_PIXELS,
+            )
+        except Exception:
+            self.fail("invalid_image")
+        if image.format not in self.FORMATS:
+            self.fail("invalid_format")
+        width, height = image.size
+        if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            self.fail(
+                "too_many_pixels",
+                max_pixels=settings.IMAGE_UPLOAD_MAX_PIXELS,
+            )
+        try:
+            image.verify()
+        except Exception:
+            self.fail("invalid_image")
+        return image.format
+
+    def to_internal_value(self, data):
+        if data in ("", None):
+            if self.required:
+                self.fail("required")
+            return None
+        if isinstance(data, str):
+            data = self._decode_base64(data)
+        elif not isinstance(data, UploadedFile):
+            self.fail("invalid")
+        if not data.size:
+            self.fail("empty")
+        if data.size > settings.FILE_UPLOAD_MAX_SIZE:
+            self._fail_too_large()
+        image_format = self._check_image(data)
+        data.seek(0)
+        data.name = f"{uuid.uuid4()}.{self.FORMATS[image_format]}"
+        data.content_type = Image.MIME[image_format]
+        return data
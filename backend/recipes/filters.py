@@ -1,17 +1,110 @@
-from django.db.models import IntegerField, Value
+from django import forms
+from django.db.models import (Case, Exists, IntegerField, OuterRef, Value,
+                              When)
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.exceptions import ValidationError
 
 from users.models import User
+from .caching import get_tag_ids_by_slug
 from .models import Ingredient, Recipe
+from .search import search_recipes
+
+TAGS_MATCH_ANY = "any"
+TAGS_MATCH_ALL = "all"
+RECIPE_IDS_LIMIT = 100
+
+
+class TagSlugsField(forms.MultipleChoiceField):
+    def valid_value(self, value):
+        return True
+
+
+class TagsFilter(filters.MultipleChoiceFilter):
+    """Match recipes by tag slugs without joining recipe_tags.
+
+    Slugs resolve to ids through the cached tag map and every condition is
+    an EXISTS over the (recipe_id, tag_id) unique index, so a recipe never
+    appears twice and no DISTINCT is needed. Unknown slugs match nothing.
+    """
+
+    field_class = TagSlugsField
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        tag_map = get_tag_ids_by_slug()
+        tag_ids = {tag_map[slug] for slug in value if slug in tag_map}
+        match = self.parent.form.cleaned_data.get("tags_match")
+        if match == TAGS_MATCH_ALL:
+            if len(tag_ids) < len(set(value)):
+                return qs.none()
+            for tag_id in tag_ids:
+                qs = qs.filter(self._tagged(tag_id=tag_id))
+            return qs
+        if not tag_ids:
+            return qs.none()
+        return qs.filter(self._tagged(tag_id__in=tag_ids))
+
+    def _tagged(self, **lookups):
+        return Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef("pk"), **lookups
+            )
+        )
+
+
+class RecipeIdsFilter(filters.BaseInFilter, filters.Filter):
+    """Fetch a batch of recipes by id in the order the ids were given."""
+
+    field_class = forms.IntegerField
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        recipe_ids = list(dict.fromkeys(value))
+        if len(recipe_ids) > RECIPE_IDS_LIMIT:
+            raise ValidationError(
+                {
+                    self.field_name: [
+                        f"Можно запросить не больше {RECIPE_IDS_LIMIT} "
+                        "рецептов"
+                    ]
+                }
+            )
+        return qs.filter(id__in=recipe_ids).order_by(
+            Case(
+                *(
+                    When(id=recipe_id, then=Value(position))
+                    for position, recipe_id in enumerate(recipe_ids)
+                ),
+                output_field=IntegerField(),
+            )
+        )
 
 
 class RecipeFilter(FilterSet):
+    ids = RecipeIdsFilter(field_name="ids")
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
-    tags = filters.AllValuesMultipleFilter(field_name="tags__slug")
+    tags = TagsFilter()
+    tags_match = filters.ChoiceFilter(
+        choices=(
+            (TAGS_MATCH_ANY, TAGS_MATCH_ANY),
+            (TAGS_MATCH_ALL, TAGS_MATCH_ALL),
+        ),
+        method="skip_filter",
+    )
+    search = filters.CharFilter(method="search_by_text")
     is_favorited = filters.NumberFilter(method="get_is_favorited")
     is_in_shopping_cart = filters.NumberFilter(
         method="get_is_in_shopping_cart"
     )
+    ordering = filters.ChoiceFilter(
+        choices=(
+            ("popularity", "popularity"),
+            ("-popularity", "-popularity"),
+        ),
+        method="order_by_popularity",
+    )
 
     class Meta:
         model = Recipe
@@ -28,6 +121,17 @@ class RecipeFilter(FilterSet):
 
         return check_user
 
+    def skip_filter(self, queryset, name, value):
+        return queryset
+
+    def search_by_text(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def order_by_popularity(self, queryset, name, value):
+        if value.startswith("-"):
+            return queryset.order_by("-favorites_count", "-id")
+        return queryset.order_by("favorites_count", "id")
+
     @if_user_is_anonymous
     def get_is_favorited(self, queryset, name, value):
         if value:
@@ -0,0 +1,265 @@
+import base64
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from PIL import Image, ImageFilter, ImageOps, features
+
+from .models import Recipe, RecipeImageJob, RecipeImageVariants, StoredImage
+
+VARIANT_SIZES = {
+    "card": (640, 640),
+    "detail": (1280, 1280),
+}
+VARIANTS_DIR = "recipes/images/variants/"
+PLACEHOLDER = "placeholder"
+PLACEHOLDER_SIZE = (16, 16)
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+MAX_JOB_ATTEMPTS = 3
+JOB_BATCH_SIZE = 20
+
+
+def get_image_storage():
+    return Recipe._meta.get_field("image").storage
+
+
+def get_stored_image_name(image):
+    """Name the file of ``image`` has in the storage once it is saved."""
+    if not image:
+        return ""
+    if image._committed:
+        return image.name
+    return image.storage.get_content_name(
+        image.field.generate_filename(image.instance, image.name),
+        image.file,
+    )
+
+
+def acquire_image(name):
+    """Count one more reference to the stored image ``name``."""
+    while not StoredImage.objects.filter(name=name).update(
+        references=F("references") + 1
+    ):
+        _, created = StoredImage.objects.get_or_create(
+            name=name, defaults={"references": 1}
+        )
+        if created:
+            return
+
+
+def delete_unreferenced_image(name):
+    with transaction.atomic():
+        image = (
+            StoredImage.objects.select_for_update()
+            .filter(name=name, references=0)
+            .first()
+        )
+        if image is not None:
+            get_image_storage().delete(name)
+            image.delete()
+
+
+def release_image(name):
+    """Drop a reference to ``name``; the last one takes the file with it.
+
+    The file is deleted after commit, under a lock on the counter, so an
+    upload of the same content that took a reference meanwhile keeps it.
+    """
+    StoredImage.objects.filter(name=name, references__gt=0).update(
+        references=F("references") - 1
+    )
+    transaction.on_commit(lambda: delete_unreferenced_image(name))
+
+
+def _get_formats():
+    formats = {
+        "jpeg": (
+            "JPEG",
+            {"quality": JPEG_QUALITY, "optimize": True, "progressive": True},
+        )
+    }
+    if features.check("webp"):
+        formats["webp"] = ("WEBP", {"quality": WEBP_QUALITY, "method": 4})
+    return formats
+
+
+def _open_rgb(storage, name):
+    with storage.open(name) as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            return background
+        return image.convert("RGB")
+
+
+def _save_variant(image, name, image_format, options):
+    # Variants belong to one recipe, so they are not shared by content.
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def _build_placeholder(image):
+    placeholder = image.copy()
+    placeholder.thumbnail(PLACEHOLDER_SIZE)
+    placeholder = placeholder.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    placeholder.save(buffer, "JPEG", quality=50)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/jpeg;base64,{encoded}"
+
+
+def build_image_variants(name):
+    """Write the resized variants of the image ``name`` to the storage.
+
+    Runs in a worker process: it only touches the storage, never the
+    database. Returns the stored variant names by size and format and
+    a blurred placeholder as a data URI.
+    """
+    image = _open_rgb(get_image_storage(), name)
+    stem = os.path.splitext(os.path.basename(name))[0]
+    data = {}
+    for size, bounds in VARIANT_SIZES.items():
+        variant = image.copy()
+        variant.thumbnail(bounds, Image.LANCZOS)
+        data[size] = {
+            extension: _save_variant(
+                variant,
+                f"{VARIANTS_DIR}{stem}_{size}.{extension}",
+                image_format,
+                options,
+            )
+            for extension, (image_format, options) in _get_formats().items()
+        }
+    data[PLACEHOLDER] = _build_placeholder(image)
+    return data
+
+
+def _get_variant_names(data):
+    return {
+        name
+        for size, formats in (data or {}).items()
+        if size != PLACEHOLDER
+        for name in formats.values()
+    }
+
+
+def _delete_variant_files(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def delete_image_variants_on_commit(data):
+    names = _get_variant_names(data)
+    transaction.on_commit(lambda: _delete_variant_files(names))
+
+
+def save_image_variants(job, data):
+    """Store the variants built for ``job`` and drop the job if unchanged.
+
+    A job re-queued with a newer image while this one was running stays
+    in the queue; files of the replaced variants are removed.
+    """
+    with transaction.atomic():
+        if not Recipe.objects.filter(pk=job.recipe_id).exists():
+            _delete_variant_files(_get_variant_names(data))
+            return
+        previous = (
+            RecipeImageVariants.objects.filter(recipe_id=job.recipe_id)
+            .values_list("data", flat=True)
+            .first()
+        )
+        RecipeImageVariants.objects.update_or_create(
+            recipe_id=job.recipe_id,
+            defaults={"source": job.image, "data": data},
+        )
+        RecipeImageJob.objects.filter(pk=job.pk, image=job.image).delete()
+    _delete_variant_files(
+        _get_variant_names(previous) - _get_variant_names(data)
+    )
+
+
+def process_image_jobs(executor, limit=JOB_BATCH_SIZE):
+    """Build variants for up to ``limit`` queued jobs on ``executor``.
+
+    Failed jobs keep their error and are retried up to MAX_JOB_ATTEMPTS
+    times. Returns the number of jobs taken from the queue.
+    """
+    jobs = list(
+        RecipeImageJob.objects.filter(attempts__lt=MAX_JOB_ATTEMPTS)[:limit]
+    )
+    futures = [
+        (job, executor.submit(build_image_variants, job.image))
+        for job in jobs
+    ]
+    for job, future in futures:
+        try:
+            data = future.result()
+        except Exception as error:
+            RecipeImageJob.objects.filter(pk=job.pk).update(
+                attempts=F("attempts") + 1, error=repr(error)
+            )
+            continue
+        save_image_variants(job, data)
+    return len(jobs)
+
+
+def enqueue_image_variants(recipe):
+    if not recipe.image:
+        return
+    RecipeImageJob.objects.update_or_create(
+        recipe=recipe,
+        defaults={"image": recipe.image.name, "attempts": 0, "error": ""},
+    )
+
+
+def get_image_variants(image, source, data):
+    """Relative URLs of the variants built from ``image``.
+
+    None until the variants of the current image are ready.
+    """
+    if not image or not data or source != image:
+        return None
+    return {
+        size: (
+            formats
+            if size == PLACEHOLDER
+            else {
+                extension: default_storage.url(name)
+                for extension, name in formats.items()
+            }
+        )
+        for size, formats in data.items()
+    }
+
+
+def get_recipe_image_variants(recipe):
+    variants = getattr(recipe, "image_variants", None)
+    if variants is None:
+        return None
+    return get_image_variants(
+        recipe.image.name, variants.source, variants.data
+    )
+
+
+def build_absolute_image_variants(variants, request):
+    if variants is None:
+        return None
+    return {
+        size: (
+            urls
+            if size == PLACEHOLDER
+            else {
+                extension: request.build_absolute_uri(url)
+                for extension, url in urls.items()
+            }
+        )
+        for size, urls in variants.items()
+    }
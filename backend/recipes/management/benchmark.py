@@ -0,0 +1,46 @@
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from users.models import User
+
+
+def create_benchmark_recipes(recipes, tags, ingredients, authors=1):
+    """Create generated recipes spread evenly over ``authors`` users."""
+    author_objects = [
+        User.objects.create_user(
+            username=f"benchmark_author_{index}",
+            email=f"benchmark_author_{index}@example.com",
+        )
+        for index in range(authors)
+    ]
+    tag_objects = [
+        Tag.objects.create(
+            name=f"benchmark тег {index}",
+            color=f"#{index:06d}",
+            slug=f"benchmark_{index}",
+        )
+        for index in range(tags)
+    ]
+    ingredient_objects = [
+        Ingredient.objects.create(
+            name=f"benchmark ингредиент {index}",
+            measurement_unit="г",
+        )
+        for index in range(ingredients)
+    ]
+    ingredient_amounts = []
+    for index in range(recipes):
+        recipe = Recipe.objects.create(
+            author=author_objects[index % authors],
+            name=f"benchmark рецепт {index}",
+            image="recipes/images/benchmark.png",
+            text="описание рецепта " * 20,
+            cooking_time=index + 1,
+        )
+        recipe.tags.set(tag_objects)
+        ingredient_amounts.extend(
+            IngredientAmount(
+                recipe=recipe, ingredient=ingredient, amount=index + 1
+            )
+            for ingredient in ingredient_objects
+        )
+    IngredientAmount.objects.bulk_create(ingredient_amounts)
+    return author_objects
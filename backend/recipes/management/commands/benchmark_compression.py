@@ -0,0 +1,98 @@
+import gzip
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from recipes.management.benchmark import create_benchmark_recipes
+from users.models import Subscription, User
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare gzip and brotli sizes and CPU time on API payloads of "
+        "generated data; the data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=600)
+        parser.add_argument("--authors", type=int, default=100)
+        parser.add_argument("--tags", type=int, default=3)
+        parser.add_argument("--ingredients", type=int, default=10)
+        parser.add_argument("--limit", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def _get_codecs(self):
+        codecs = {
+            f"gzip -{level}": (
+                lambda data, level=level: gzip.compress(
+                    data, compresslevel=level, mtime=0
+                )
+            )
+            for level in (1, 6, 9)
+        }
+        if brotli is not None:
+            codecs.update(
+                {
+                    f"brotli q{quality}": (
+                        lambda data, quality=quality: brotli.compress(
+                            data, quality=quality
+                        )
+                    )
+                    for quality in (1, 5, 11)
+                }
+            )
+        return codecs
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            authors = create_benchmark_recipes(
+                options["recipes"],
+                options["tags"],
+                options["ingredients"],
+                authors=options["authors"],
+            )
+            subscriber = User.objects.create_user(
+                username="benchmark_subscriber",
+                email="benchmark_subscriber@example.com",
+            )
+            Subscription.objects.bulk_create(
+                Subscription(user=subscriber, author=author)
+                for author in authors
+            )
+            client = APIClient()
+            client.force_authenticate(subscriber)
+            limit = options["limit"]
+            urls = {
+                "recipes": f"/api/recipes/?limit={limit}",
+                "recipes (sideload)": (
+                    f"/api/recipes/?limit={limit}&sideload=1"
+                ),
+                "subscriptions": f"/api/users/subscriptions/?limit={limit}",
+                "ingredients": "/api/ingredients/",
+            }
+            payloads = {
+                name: client.get(url).content for name, url in urls.items()
+            }
+            transaction.set_rollback(True)
+        for name, payload in payloads.items():
+            self.stdout.write(f"{name}: {len(payload)} bytes")
+            for codec_name, compress in self._get_codecs().items():
+                seconds = min(
+                    timeit.repeat(
+                        lambda: compress(payload),
+                        number=1,
+                        repeat=options["repeat"],
+                    )
+                )
+                size = len(compress(payload))
+                self.stdout.write(
+                    f"  {codec_name}: {size} bytes "
+                    f"({size / len(payload):.1%}), {seconds * 1000:.2f} ms"
+                )
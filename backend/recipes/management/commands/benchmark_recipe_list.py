@@ -0,0 +1,91 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.documents import get_recipe_fields
+from recipes.fast_serializers import (get_recipe_rows, serialize_recipe_rows,
+                                      serialize_sideloaded_recipe_rows)
+from recipes.management.benchmark import create_benchmark_recipes
+from recipes.serializers import RecipeReadSerializer
+from recipes.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare RecipeReadSerializer with the values()-based fast path, "
+        "plain and side-loaded, on a page of generated recipes; the data "
+        "is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=100)
+        parser.add_argument("--tags", type=int, default=3)
+        parser.add_argument("--ingredients", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            create_benchmark_recipes(
+                options["recipes"], options["tags"], options["ingredients"]
+            )
+            request = Request(APIRequestFactory().get("/api/recipes/"))
+            view = RecipeViewSet(action="list", format_kwarg=None)
+            view.request = request
+            fields = get_recipe_fields(request)
+            queryset = view.get_queryset()[: options["recipes"]]
+
+            def render_serializer():
+                return JSONRenderer().render(
+                    RecipeReadSerializer(
+                        queryset.all(),
+                        many=True,
+                        context={"request": request},
+                    ).data
+                )
+
+            def render_fast():
+                return JSONRenderer().render(
+                    serialize_recipe_rows(
+                        get_recipe_rows(queryset.all(), fields),
+                        request,
+                        fields,
+                    )
+                )
+
+            def render_sideloaded():
+                results, included = serialize_sideloaded_recipe_rows(
+                    get_recipe_rows(queryset.all(), fields),
+                    request,
+                    fields,
+                )
+                return JSONRenderer().render(
+                    {"results": results, "included": included}
+                )
+
+            if render_serializer() != render_fast():
+                self.stderr.write("Outputs differ")
+            timings = {
+                "RecipeReadSerializer": render_serializer,
+                "fast_serializers": render_fast,
+                "fast_serializers (sideload)": render_sideloaded,
+            }
+            results = {
+                name: min(
+                    timeit.repeat(func, number=1, repeat=options["repeat"])
+                )
+                for name, func in timings.items()
+            }
+            for name, seconds in results.items():
+                size = len(timings[name]())
+                self.stdout.write(
+                    f"{name}: {seconds * 1000:.2f} ms, {size} bytes"
+                )
+            speedup = (
+                results["RecipeReadSerializer"] / results["fast_serializers"]
+            )
+            self.stdout.write(f"speedup: {speedup:.1f}x")
+            transaction.set_rollback(True)
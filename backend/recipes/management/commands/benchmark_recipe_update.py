@@ -0,0 +1,63 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from recipes.management.benchmark import create_benchmark_recipes
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Time PATCH /api/recipes/<id>/ replacing every ingredient of a "
+        "generated recipe; the data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ingredients", type=int, default=30)
+        parser.add_argument("--tags", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            author, = create_benchmark_recipes(
+                1, options["tags"], options["ingredients"]
+            )
+            recipe = Recipe.objects.get(author=author)
+            data = {
+                "ingredients": [
+                    {"id": ingredient_id, "amount": 3}
+                    for ingredient_id in Ingredient.objects.filter(
+                        name__startswith="benchmark"
+                    ).values_list("id", flat=True)
+                ],
+                "tags": list(
+                    Tag.objects.filter(
+                        slug__startswith="benchmark"
+                    ).values_list("id", flat=True)
+                ),
+                "name": "benchmark рецепт",
+                "text": "обновленное описание",
+                "cooking_time": 12,
+            }
+            client = APIClient()
+            client.force_authenticate(author)
+            url = f"/api/recipes/{recipe.id}/"
+            # the search backend is picked once per process
+            get_search_backend()
+
+            def update():
+                response = client.patch(url, data, format="json")
+                if response.status_code != 200:
+                    raise RuntimeError(response.content)
+
+            seconds = min(
+                timeit.repeat(update, number=1, repeat=options["repeat"])
+            )
+            self.stdout.write(
+                f"{len(data['ingredients'])} ingredients: "
+                f"{seconds * 1000:.2f} ms"
+            )
+            transaction.set_rollback(True)
@@ -0,0 +1,81 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from foodgram.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from recipes.management.benchmark import create_benchmark_recipes
+from users.models import Subscription, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare JSON renderers on a recipe page and a subscription page "
+        "of generated data; the data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=600)
+        parser.add_argument("--authors", type=int, default=100)
+        parser.add_argument("--tags", type=int, default=3)
+        parser.add_argument("--ingredients", type=int, default=10)
+        parser.add_argument("--limit", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def _get_page(self, client, url):
+        response = client.get(url, HTTP_ACCEPT="application/json")
+        return response.data
+
+    def handle(self, *args, **options):
+        renderers = {
+            "JSONRenderer": JSONRenderer(),
+            "ORJSONRenderer": ORJSONRenderer(),
+        }
+        if msgpack is not None:
+            renderers["MessagePackRenderer"] = MessagePackRenderer()
+        with transaction.atomic():
+            authors = create_benchmark_recipes(
+                options["recipes"],
+                options["tags"],
+                options["ingredients"],
+                authors=options["authors"],
+            )
+            subscriber = User.objects.create_user(
+                username="benchmark_subscriber",
+                email="benchmark_subscriber@example.com",
+            )
+            Subscription.objects.bulk_create(
+                Subscription(user=subscriber, author=author)
+                for author in authors
+            )
+            client = APIClient()
+            client.force_authenticate(subscriber)
+            limit = options["limit"]
+            pages = {
+                "recipes": self._get_page(
+                    client, f"/api/recipes/?limit={limit}"
+                ),
+                "subscriptions": self._get_page(
+                    client, f"/api/users/subscriptions/?limit={limit}"
+                ),
+            }
+            for page_name, data in pages.items():
+                self.stdout.write(f"{page_name}:")
+                baseline = None
+                for name, renderer in renderers.items():
+                    seconds = min(
+                        timeit.repeat(
+                            lambda: renderer.render(data),
+                            number=1,
+                            repeat=options["repeat"],
+                        )
+                    )
+                    size = len(renderer.render(data))
+                    baseline = baseline or seconds
+                    self.stdout.write(
+                        f"  {name}: {seconds * 1000:.2f} ms, {size} bytes, "
+                        f"{baseline / seconds:.1f}x"
+                    )
+            transaction.set_rollback(True)
@@ -0,0 +1,38 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.images import JOB_BATCH_SIZE, process_image_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Build card and detail variants of queued recipe images on a "
+        "process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=settings.IMAGE_VARIANT_WORKERS
+        )
+        parser.add_argument("--batch", type=int, default=JOB_BATCH_SIZE)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue and exit instead of polling it.",
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        with ProcessPoolExecutor(max_workers=options["workers"]) as executor:
+            while True:
+                taken = process_image_jobs(executor, options["batch"])
+                processed += taken
+                if taken:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(settings.IMAGE_VARIANT_POLL_INTERVAL)
+        self.stdout.write(f"Processed {processed} image jobs")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the recipe full-text search index from scratch."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(f"Rebuilt with {type(backend).__name__}")
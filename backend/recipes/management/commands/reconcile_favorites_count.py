@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Repair Recipe.favorites_count where it drifted from Favorite rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report recipes with a wrong counter.",
+        )
+
+    def handle(self, *args, **options):
+        actual_count = Coalesce(
+            Subquery(
+                Favorite.objects.filter(recipe=OuterRef("pk"))
+                .order_by()
+                .values("recipe")
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+            0,
+        )
+        drifted = (
+            Recipe.objects.order_by()
+            .annotate(actual=actual_count)
+            .exclude(favorites_count=F("actual"))
+            .values_list("id", "favorites_count", "actual")
+        )
+        recipe_ids = []
+        for recipe_id, stored, actual in drifted.iterator():
+            self.stdout.write(f"{recipe_id}: {stored} -> {actual}")
+            recipe_ids.append(recipe_id)
+        if not options["dry_run"]:
+            # Recount in the UPDATE itself so favorites added after the scan
+            # are not overwritten with a stale value.
+            for start in range(0, len(recipe_ids), BATCH_SIZE):
+                Recipe.objects.filter(
+                    id__in=recipe_ids[start:start + BATCH_SIZE]
+                ).update(favorites_count=actual_count)
+        self.stdout.write(f"Recipes with drift: {len(recipe_ids)}")
@@ -0,0 +1,51 @@
+# Generated by Django 4.0.6 on 2026-10-18 03:10
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeDocument",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="document",
+                        serialize=False,
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                ("data", models.JSONField(verbose_name="Документ рецепта")),
+            ],
+            options={
+                "verbose_name": "Документ рецепта",
+                "verbose_name_plural": "Документы рецептов",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="ingredientamount",
+            options={
+                "verbose_name": "Количество ингредиента",
+                "verbose_name_plural": "Количество ингредиентов",
+            },
+        ),
+        migrations.AlterField(
+            model_name="ingredientamount",
+            name="amount",
+            field=models.PositiveIntegerField(
+                validators=[django.core.validators.MinValueValidator(1)],
+                verbose_name="Количество",
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import OperationalError, migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TABLE recipes_recipe_search ("
+            "recipe_id bigint PRIMARY KEY "
+            "REFERENCES recipes_recipe (id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX recipes_recipe_search_document_gin "
+            "ON recipes_recipe_search USING gin (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO recipes_recipe_search (recipe_id, document) "
+            "SELECT id, "
+            "setweight(to_tsvector('russian', name), 'A') || "
+            "setweight(to_tsvector('russian', text), 'B') "
+            "FROM recipes_recipe"
+        )
+    elif vendor == "sqlite":
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5("
+                "name, text, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5; search falls back to the
+            # in-process index.
+            return
+        schema_editor.execute(
+            "INSERT INTO recipes_recipe_fts (rowid, name, text) "
+            "SELECT id, name, text FROM recipes_recipe"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP TABLE IF EXISTS recipes_recipe_search")
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS recipes_recipe_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_recipe_updated_at_catalogversion"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
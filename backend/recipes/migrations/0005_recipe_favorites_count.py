@@ -0,0 +1,49 @@
+# Generated by Django 4.0.6 on 2026-10-18 03:26
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_favorites_count(apps, schema_editor):
+    Favorite = apps.get_model("recipes", "Favorite")
+    Recipe = apps.get_model("recipes", "Recipe")
+    Recipe.objects.update(
+        favorites_count=Coalesce(
+            Subquery(
+                Favorite.objects.filter(recipe=OuterRef("pk"))
+                .order_by()
+                .values("recipe")
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_recipe_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="В избранном"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-favorites_count", "-id"],
+                name="recipe_popularity_idx",
+            ),
+        ),
+        migrations.RunPython(
+            fill_favorites_count, migrations.RunPython.noop
+        ),
+    ]
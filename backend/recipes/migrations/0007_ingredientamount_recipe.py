@@ -0,0 +1,107 @@
+# Generated by Django 4.0.6 on 2026-10-18 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def move_ingredients_to_recipes(apps, schema_editor):
+    """Give every recipe its own ingredient rows.
+
+    The first recipe linked to a shared row takes it over so its id stays
+    the same, every other recipe gets a copy. Documents of recipes that got
+    copies still list the shared ids, so they are dropped to be rebuilt on
+    the next read, and ``updated_at`` is bumped to change their ETags.
+    """
+    IngredientAmount = apps.get_model("recipes", "IngredientAmount")
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeDocument = apps.get_model("recipes", "RecipeDocument")
+    links = (
+        Recipe.ingredients.through.objects.select_related("ingredientamount")
+        .order_by("id")
+        .iterator()
+    )
+    owned_ids = set()
+    taken_over = []
+    copies = []
+    for link in links:
+        ingredient_amount = link.ingredientamount
+        if ingredient_amount.id in owned_ids:
+            copies.append(
+                IngredientAmount(
+                    recipe_id=link.recipe_id,
+                    ingredient_id=ingredient_amount.ingredient_id,
+                    amount=ingredient_amount.amount,
+                )
+            )
+            continue
+        owned_ids.add(ingredient_amount.id)
+        ingredient_amount.recipe_id = link.recipe_id
+        taken_over.append(ingredient_amount)
+    IngredientAmount.objects.bulk_update(
+        taken_over, ["recipe"], batch_size=BATCH_SIZE
+    )
+    IngredientAmount.objects.bulk_create(copies, batch_size=BATCH_SIZE)
+    IngredientAmount.objects.filter(recipe__isnull=True).delete()
+    copied_recipe_ids = {copy.recipe_id for copy in copies}
+    RecipeDocument.objects.filter(recipe_id__in=copied_recipe_ids).delete()
+    Recipe.objects.filter(id__in=copied_recipe_ids).update(
+        updated_at=timezone.now()
+    )
+
+
+def move_ingredients_to_m2m(apps, schema_editor):
+    IngredientAmount = apps.get_model("recipes", "IngredientAmount")
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeIngredients = Recipe.ingredients.through
+    RecipeIngredients.objects.bulk_create(
+        (
+            RecipeIngredients(
+                recipe_id=recipe_id, ingredientamount_id=ingredient_amount_id
+            )
+            for ingredient_amount_id, recipe_id in (
+                IngredientAmount.objects.values_list("id", "recipe_id")
+            )
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_feedentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingredientamount",
+            name="recipe",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="recipes.recipe",
+                verbose_name="Рецепт",
+            ),
+        ),
+        migrations.RunPython(
+            move_ingredients_to_recipes, move_ingredients_to_m2m
+        ),
+        migrations.RemoveField(
+            model_name="recipe",
+            name="ingredients",
+        ),
+        migrations.AlterField(
+            model_name="ingredientamount",
+            name="recipe",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="ingredients",
+                to="recipes.recipe",
+                verbose_name="Рецепт",
+            ),
+        ),
+    ]
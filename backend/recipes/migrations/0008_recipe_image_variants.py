@@ -0,0 +1,91 @@
+# Generated by Django 4.0.6 on 2026-10-18 03:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_ingredientamount_recipe"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeImageVariants",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="image_variants",
+                        serialize=False,
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        max_length=100, verbose_name="Исходная картинка"
+                    ),
+                ),
+                ("data", models.JSONField(verbose_name="Варианты картинки")),
+            ],
+            options={
+                "verbose_name": "Варианты картинки рецепта",
+                "verbose_name_plural": "Варианты картинок рецептов",
+            },
+        ),
+        migrations.CreateModel(
+            name="RecipeImageJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "image",
+                    models.CharField(max_length=100, verbose_name="Картинка"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата постановки"
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Попытки"
+                    ),
+                ),
+                (
+                    "error",
+                    models.TextField(
+                        blank=True, verbose_name="Последняя ошибка"
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="image_job",
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Задача обработки картинки",
+                "verbose_name_plural": "Задачи обработки картинок",
+                "ordering": ("created_at",),
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.0.6 on 2026-10-18 03:52
+
+from django.db import migrations, models
+from django.db.models import Count
+
+import recipes.storage
+
+
+def count_image_references(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    StoredImage = apps.get_model("recipes", "StoredImage")
+    StoredImage.objects.bulk_create(
+        (
+            StoredImage(name=row["image"], references=row["references"])
+            for row in Recipe.objects.exclude(image="")
+            .order_by()
+            .values("image")
+            .annotate(references=Count("id"))
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_recipe_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredImage",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=100,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Файл",
+                    ),
+                ),
+                (
+                    "references",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Число ссылок"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Сохранённая картинка",
+                "verbose_name_plural": "Сохранённые картинки",
+            },
+        ),
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                storage=recipes.storage.ContentAddressedStorage(),
+                upload_to="recipes/images/",
+                verbose_name="Картинка",
+            ),
+        ),
+        migrations.RunPython(
+            count_image_references, migrations.RunPython.noop
+        ),
+    ]
@@ -3,6 +3,11 @@ from django.db import models
 
 from users.models import User
 
+from .storage import ContentAddressedStorage
+
+# Fields indexed for ?search=.
+RECIPE_SEARCH_FIELDS = ("name", "text")
+
 
 class Tag(models.Model):
     name = models.CharField(
@@ -64,6 +69,12 @@ class Ingredient(models.Model):
 
 
 class IngredientAmount(models.Model):
+    recipe = models.ForeignKey(
+        "Recipe",
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+        related_name="ingredients",
+    )
     ingredient = models.ForeignKey(
         Ingredient,
         on_delete=models.CASCADE,
@@ -93,32 +104,74 @@ class Recipe(models.Model):
         verbose_name="Автор рецепта",
         related_name="recipes",
     )
-    ingredients = models.ManyToManyField(
-        IngredientAmount,
-        verbose_name="Список ингредиентов",
-        related_name="recipes",
-    )
     name = models.CharField(
         max_length=200,
         verbose_name="Название",
     )
     image = models.ImageField(
         upload_to="recipes/images/",
+        storage=ContentAddressedStorage(),
         verbose_name="Картинка",
     )
     text = models.TextField(verbose_name="Описание")
     cooking_time = models.PositiveIntegerField(
         validators=[MinValueValidator(1)],
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="В избранном",
+    )
 
     class Meta:
         ordering = ("-id",)
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = [
+            models.Index(
+                fields=("-favorites_count", "-id"),
+                name="recipe_popularity_idx",
+            )
+        ]
 
     def __str__(self):
         return f"{self.name}"
 
+    def save(self, *args, **kwargs):
+        # favorites_count only moves through F() updates: saving a loaded
+        # row must not write back the value read before them.
+        if not self._state.adding and not (
+            args
+            or kwargs.get("force_insert")
+            or kwargs.get("update_fields") is not None
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name != "favorites_count"
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "image" in field_names:
+            # Kept to tell a replaced image from the one in the database.
+            instance._loaded_image = values[field_names.index("image")]
+        if all(field in field_names for field in RECIPE_SEARCH_FIELDS):
+            # Kept to tell an edit of the searched text from other saves.
+            instance._loaded_search_text = tuple(
+                values[field_names.index(field)]
+                for field in RECIPE_SEARCH_FIELDS
+            )
+        return instance
+
 
 class Favorite(models.Model):
     user = models.ForeignKey(
@@ -181,3 +234,161 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f"{self.user} добавил рецепт {self.recipe}"
+
+
+class RecipeDocument(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="document",
+        verbose_name="Рецепт",
+    )
+    data = models.JSONField(verbose_name="Документ рецепта")
+
+    class Meta:
+        verbose_name = "Документ рецепта"
+        verbose_name_plural = "Документы рецептов"
+
+    def __str__(self):
+        return f"Документ рецепта {self.recipe_id}"
+
+
+class CatalogVersion(models.Model):
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name="Справочник",
+    )
+    version = models.PositiveBigIntegerField(
+        default=1,
+        verbose_name="Версия",
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+    )
+
+    class Meta:
+        verbose_name = "Версия справочника"
+        verbose_name_plural = "Версии справочников"
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор рецепта",
+    )
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=(
+                    "user",
+                    "recipe",
+                ),
+                name="unique_feed_entry_user_recipe",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("user", "author"),
+                name="feed_entry_user_author_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} в ленте {self.user}"
+
+
+class RecipeImageVariants(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="image_variants",
+        verbose_name="Рецепт",
+    )
+    source = models.CharField(
+        max_length=100,
+        verbose_name="Исходная картинка",
+    )
+    data = models.JSONField(verbose_name="Варианты картинки")
+
+    class Meta:
+        verbose_name = "Варианты картинки рецепта"
+        verbose_name_plural = "Варианты картинок рецептов"
+
+    def __str__(self):
+        return f"Варианты картинки рецепта {self.recipe_id}"
+
+
+class RecipeImageJob(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="image_job",
+        verbose_name="Рецепт",
+    )
+    image = models.CharField(
+        max_length=100,
+        verbose_name="Картинка",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата постановки",
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Попытки",
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name="Последняя ошибка",
+    )
+
+    class Meta:
+        ordering = ("created_at",)
+        verbose_name = "Задача обработки картинки"
+        verbose_name_plural = "Задачи обработки картинок"
+
+    def __str__(self):
+        return f"Обработка картинки {self.image}"
+
+
+class StoredImage(models.Model):
+    name = models.CharField(
+        max_length=100,
+        primary_key=True,
+        verbose_name="Файл",
+    )
+    references = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Число ссылок",
+    )
+
+    class Meta:
+        verbose_name = "Сохранённая картинка"
+        verbose_name_plural = "Сохранённые картинки"
+
+    def __str__(self):
+        return f"{self.name} ({self.references})"
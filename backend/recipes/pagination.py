@@ -1,7 +1,171 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import F
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from foodgram.settings import PS
+from .caching import (get_cache_version, get_normalized_query,
+                      shorten_cache_key)
+from .filters import RECIPE_IDS_LIMIT
 
+COUNT_CACHE_TIMEOUT = 60 * 5
+
+
+class CachedCountPaginator(Paginator):
+    def __init__(self, object_list, per_page, cache_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_key = cache_key
+
+    @cached_property
+    def count(self):
+        if self.cache_key is None:
+            return super().count
+        count = cache.get(self.cache_key)
+        if count is None:
+            count = super().count
+            cache.set(self.cache_key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class NoCountPaginator(Paginator):
+    def page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        self.count = bottom + len(rows)
+        return self._get_page(rows[:self.per_page], number, self)
+
+
+class CachedCountPagination(PageNumberPagination):
+    page_size = PS
+    page_size_query_param = "limit"
+    count_query_param = "count"
+    count_cache_namespace = None
+    personal_query_params = ()
+    personal_actions = ()
+    ignored_query_params = ("page", "limit", "pagination", "cursor", "count")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.without_count = (
+            request.query_params.get(self.count_query_param) == "0"
+        )
+        self.count_cache_key = self.get_count_cache_key(request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        if self.without_count:
+            return NoCountPaginator(object_list, per_page)
+        return CachedCountPaginator(
+            object_list, per_page, cache_key=self.count_cache_key
+        )
+
+    def is_personal(self, request, view):
+        return getattr(view, "action", None) in self.personal_actions or any(
+            request.query_params.get(param) not in (None, "", "0")
+            for param in self.personal_query_params
+        )
+
+    def get_count_cache_key(self, request, view):
+        if self.count_cache_namespace is None:
+            return None
+        user_id = None
+        if request.user.is_authenticated and self.is_personal(request, view):
+            user_id = request.user.pk
+        params = get_normalized_query(request, self.ignored_query_params)
+        version = get_cache_version(self.count_cache_namespace)
+        if user_id is not None:
+            user_version = get_cache_version(
+                self.count_cache_namespace, user_id
+            )
+            version = f"{version}.{user_id}.{user_version}"
+        return shorten_cache_key(
+            f"{self.count_cache_namespace}:{version}:",
+            f"{request.path}?{params}",
+        )
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Cursor pages keyed on the ordering RecipeFilter applied.
+
+    The popularity orderings are keyed on the favorites counter with the
+    id breaking ties. Search rank and the order of requested ids cannot
+    be resumed from a cursor, so those filters are rejected.
+    """
 
-class RecipePagination(PageNumberPagination):
     page_size = PS
     page_size_query_param = "limit"
+    ordering = "-id"
+    ordering_query_param = "ordering"
+    orderings = {
+        "popularity": ("popularity", "id"),
+        "-popularity": ("-popularity", "-id"),
+    }
+    unsupported_query_params = ("ids", "search")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        for param in self.unsupported_query_params:
+            if request.query_params.get(param):
+                raise ValidationError(
+                    {
+                        param: [
+                            "Не поддерживается с курсорной пагинацией, "
+                            "используйте постраничную"
+                        ]
+                    }
+                )
+        if request.query_params.get(self.ordering_query_param):
+            queryset = queryset.annotate(popularity=F("favorites_count"))
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        return self.orderings.get(
+            request.query_params.get(self.ordering_query_param),
+            (self.ordering,),
+        )
+
+
+class RecipePagination(CachedCountPagination):
+    count_cache_namespace = "recipes_count"
+    ids_query_param = "ids"
+    personal_query_params = ("is_favorited", "is_in_shopping_cart")
+    mode_query_param = "pagination"
+    cursor_mode = "cursor"
+    cursor_pagination_class = RecipeCursorPagination
+
+    def get_page_size(self, request):
+        if (
+            self.ids_query_param in request.query_params
+            and self.page_size_query_param not in request.query_params
+        ):
+            return RECIPE_IDS_LIMIT
+        return super().get_page_size(request)
+
+    def _use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == self.cursor_mode
+            or self.cursor_pagination_class.cursor_query_param
+            in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self._use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
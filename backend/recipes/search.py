@@ -0,0 +1,277 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, FloatField, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .caching import get_cache_version, invalidate_cache
+from .models import Recipe
+
+POSTGRES_SEARCH_TABLE = "recipes_recipe_search"
+POSTGRES_SEARCH_CONFIG = "russian"
+SQLITE_SEARCH_TABLE = "recipes_recipe_fts"
+SEARCH_CACHE_NAMESPACE = "recipe_search"
+NAME_WEIGHT = 2.0
+TEXT_WEIGHT = 1.0
+
+WORD_RE = re.compile(r"\w+")
+
+
+def get_search_terms(query):
+    return [term.lower() for term in WORD_RE.findall(query)]
+
+
+class BaseSearchBackend:
+    """Keeps the recipe search index and filters recipes by a query.
+
+    ``search`` returns the queryset narrowed to matching recipes and
+    annotated with ``search_rank``, where a higher rank is a better match.
+    """
+
+    def update(self, recipe):
+        raise NotImplementedError
+
+    def remove(self, recipe_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """tsvector documents in a shadow table with a GIN index."""
+
+    document_sql = (
+        "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+        "setweight(to_tsvector(%s::regconfig, %s), 'B')"
+    )
+    tsquery_sql = "websearch_to_tsquery(%s::regconfig, %s)"
+
+    def update(self, recipe):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {POSTGRES_SEARCH_TABLE} (recipe_id, document) "
+                f"VALUES (%s, {self.document_sql}) "
+                "ON CONFLICT (recipe_id) "
+                "DO UPDATE SET document = EXCLUDED.document",
+                [
+                    recipe.id,
+                    POSTGRES_SEARCH_CONFIG,
+                    recipe.name,
+                    POSTGRES_SEARCH_CONFIG,
+                    recipe.text,
+                ],
+            )
+
+    def remove(self, recipe_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {POSTGRES_SEARCH_TABLE} WHERE recipe_id = %s",
+                [recipe_id],
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {POSTGRES_SEARCH_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {POSTGRES_SEARCH_TABLE} (recipe_id, document) "
+                "SELECT id, "
+                "setweight(to_tsvector(%s::regconfig, name), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, text), 'B') "
+                f"FROM {Recipe._meta.db_table}",
+                [POSTGRES_SEARCH_CONFIG, POSTGRES_SEARCH_CONFIG],
+            )
+
+    def search(self, queryset, query):
+        params = [POSTGRES_SEARCH_CONFIG, query]
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT recipe_id FROM {POSTGRES_SEARCH_TABLE} "
+                f"WHERE document @@ {self.tsquery_sql}",
+                params,
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT ts_rank(document, {self.tsquery_sql}) "
+                f"FROM {POSTGRES_SEARCH_TABLE} "
+                f"WHERE recipe_id = {Recipe._meta.db_table}.id",
+                params,
+                output_field=FloatField(),
+            )
+        )
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5 shadow table keyed by recipe id, ranked with bm25.
+
+    unicode61 has no Russian stemmer, so every term is matched as a prefix.
+    """
+
+    def update(self, recipe):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SQLITE_SEARCH_TABLE} WHERE rowid = %s",
+                [recipe.id],
+            )
+            cursor.execute(
+                f"INSERT INTO {SQLITE_SEARCH_TABLE} (rowid, name, text) "
+                "VALUES (%s, %s, %s)",
+                [recipe.id, recipe.name, recipe.text],
+            )
+
+    def remove(self, recipe_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SQLITE_SEARCH_TABLE} WHERE rowid = %s",
+                [recipe_id],
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLITE_SEARCH_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {SQLITE_SEARCH_TABLE} (rowid, name, text) "
+                f"SELECT id, name, text FROM {Recipe._meta.db_table}"
+            )
+
+    def search(self, queryset, query):
+        match = " ".join(f'"{term}"*' for term in get_search_terms(query))
+        if not match:
+            return queryset.none()
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {SQLITE_SEARCH_TABLE} "
+                f"WHERE {SQLITE_SEARCH_TABLE} MATCH %s",
+                [match],
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT -bm25({SQLITE_SEARCH_TABLE}, "
+                f"{NAME_WEIGHT}, {TEXT_WEIGHT}) "
+                f"FROM {SQLITE_SEARCH_TABLE} "
+                f"WHERE {SQLITE_SEARCH_TABLE} MATCH %s "
+                f"AND rowid = {Recipe._meta.db_table}.id",
+                [match],
+                output_field=FloatField(),
+            )
+        )
+
+
+class InProcessSearchBackend(BaseSearchBackend):
+    """Inverted index kept in process memory for databases without FTS.
+
+    Writes are applied to the local index and bump a cache version so
+    other processes rebuild their copy on the next search.
+    """
+
+    def __init__(self):
+        self._index = defaultdict(dict)
+        self._version = None
+
+    def _add(self, recipe_id, name, text):
+        for weight, value in ((NAME_WEIGHT, name), (TEXT_WEIGHT, text)):
+            for term in set(get_search_terms(value)):
+                postings = self._index[term]
+                postings[recipe_id] = postings.get(recipe_id, 0) + weight
+
+    def _discard(self, recipe_id):
+        for postings in self._index.values():
+            postings.pop(recipe_id, None)
+
+    def _get_index(self):
+        version = get_cache_version(SEARCH_CACHE_NAMESPACE)
+        if version != self._version:
+            self._index = defaultdict(dict)
+            recipes = Recipe.objects.values_list("id", "name", "text")
+            for recipe_id, name, text in recipes.iterator():
+                self._add(recipe_id, name, text)
+            self._version = version
+        return self._index
+
+    def _apply(self, change):
+        if self._version is None:
+            return
+        change()
+        version = get_cache_version(SEARCH_CACHE_NAMESPACE)
+        self._version = version if version == self._version + 1 else None
+
+    def update(self, recipe):
+        recipe_id, name, text = recipe.id, recipe.name, recipe.text
+
+        def change():
+            self._discard(recipe_id)
+            self._add(recipe_id, name, text)
+
+        invalidate_cache(SEARCH_CACHE_NAMESPACE)
+        transaction.on_commit(lambda: self._apply(change))
+
+    def remove(self, recipe_id):
+        invalidate_cache(SEARCH_CACHE_NAMESPACE)
+        transaction.on_commit(
+            lambda: self._apply(lambda: self._discard(recipe_id))
+        )
+
+    def rebuild(self):
+        self._version = None
+        invalidate_cache(SEARCH_CACHE_NAMESPACE)
+
+    def search(self, queryset, query):
+        terms = set(get_search_terms(query))
+        if not terms:
+            return queryset.none()
+        index = self._get_index()
+        postings = [index.get(term, {}) for term in terms]
+        recipe_ids = set.intersection(*(set(ids) for ids in postings))
+        if not recipe_ids:
+            return queryset.none()
+        ids_by_rank = defaultdict(list)
+        for recipe_id in recipe_ids:
+            rank = sum(ids[recipe_id] for ids in postings)
+            ids_by_rank[rank].append(recipe_id)
+        return queryset.filter(id__in=recipe_ids).annotate(
+            search_rank=Case(
+                *(
+                    When(id__in=ids, then=Value(rank))
+                    for rank, ids in ids_by_rank.items()
+                ),
+                output_field=FloatField(),
+            )
+        )
+
+
+def _get_default_backend_path():
+    if connection.vendor == "postgresql":
+        return "recipes.search.PostgresSearchBackend"
+    if (
+        connection.vendor == "sqlite"
+        and SQLITE_SEARCH_TABLE in connection.introspection.table_names()
+    ):
+        return "recipes.search.SQLiteSearchBackend"
+    return "recipes.search.InProcessSearchBackend"
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    path = settings.RECIPE_SEARCH_BACKEND or _get_default_backend_path()
+    return import_string(path)()
+
+
+def update_recipe_search_index(recipe):
+    get_search_backend().update(recipe)
+
+
+def search_recipes(queryset, query):
+    if not get_search_terms(query):
+        return queryset
+    return (
+        get_search_backend()
+        .search(queryset, query)
+        .order_by("-search_rank", "-id")
+    )
@@ -4,8 +4,14 @@ from rest_framework import serializers
 from users.serializers import CustomUserSerializer
 from rest_framework.serializers import ValidationError
 
+from .documents import get_recipe_fields, update_recipe_document
+from .fields import BulkPrimaryKeyRelatedField, ImageUploadField
+from .filters import RECIPE_IDS_LIMIT
+from .images import (build_absolute_image_variants, enqueue_image_variants,
+                     get_recipe_image_variants)
 from .models import (Favorite, Ingredient, IngredientAmount, Recipe,
                      ShoppingCart, Tag)
+from .search import update_recipe_search_index
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -48,6 +54,14 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         )
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=RECIPE_IDS_LIMIT,
+    )
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     tags = TagSerializer(
         many=True,
@@ -61,6 +75,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -73,11 +88,20 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
             "text",
             "cooking_time",
         )
 
-    def _get_is_object_exists(self, model, obj):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = get_recipe_fields(self.context.get("request"))
+        for field in set(self.fields) - fields:
+            self.fields.pop(field)
+
+    def _get_is_object_exists(self, model, obj, annotation):
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation)
         user = self.context["request"].user
         return (
             user.is_authenticated
@@ -88,10 +112,17 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, obj):
-        return self._get_is_object_exists(Favorite, obj)
+        return self._get_is_object_exists(Favorite, obj, "is_favorited")
 
     def get_is_in_shopping_cart(self, obj):
-        return self._get_is_object_exists(ShoppingCart, obj)
+        return self._get_is_object_exists(
+            ShoppingCart, obj, "is_in_shopping_cart"
+        )
+
+    def get_image_variants(self, obj):
+        return build_absolute_image_variants(
+            get_recipe_image_variants(obj), self.context["request"]
+        )
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
@@ -99,6 +130,7 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
         max_length=None,
         use_url=True,
     )
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -106,12 +138,29 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
             "id",
             "name",
             "image",
+            "image_variants",
             "cooking_time",
         )
 
+    def get_image_variants(self, obj):
+        return build_absolute_image_variants(
+            get_recipe_image_variants(obj), self.context["request"]
+        )
+
+
+class IngredientAmountListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        ids = [
+            item.get("id")
+            for item in (data if isinstance(data, list) else ())
+            if isinstance(item, dict)
+        ]
+        with self.child.fields["id"].preloaded(ids):
+            return super().to_internal_value(data)
+
 
 class IngredientAmountWriteSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
+    id = BulkPrimaryKeyRelatedField(
         source="ingredient", queryset=Ingredient.objects.all()
     )
 
@@ -121,18 +170,19 @@ class IngredientAmountWriteSerializer(serializers.ModelSerializer):
             "id",
             "amount",
         )
+        list_serializer_class = IngredientAmountListSerializer
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
     ingredients = IngredientAmountWriteSerializer(
         many=True,
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all(),
         required=True,
     )
-    image = Base64ImageField()
+    image = ImageUploadField()
 
     class Meta:
         model = Recipe
@@ -145,34 +195,45 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             "cooking_time",
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance is not None:
+            self.fields["image"].required = False
+
     def _add_tags_and_ingredients(self, recipe, tags_data, ingredients_data):
         recipe.tags.set(tags_data)
-        ingredient_amounts = []
-        for item in ingredients_data:
-            ingredient = item.get("ingredient")
-            amount = item.get("amount")
-            ingredient_amount, _ = IngredientAmount.objects.get_or_create(
-                ingredient=ingredient,
-                amount=amount,
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                recipe=recipe,
+                ingredient=item["ingredient"],
+                amount=item["amount"],
             )
-            ingredient_amounts.append(ingredient_amount)
-        recipe.ingredients.set(ingredient_amounts)
+            for item in ingredients_data
+        )
+        update_recipe_document(recipe)
+        update_recipe_search_index(recipe)
         return recipe
 
     def create(self, validated_data):
         tags_data = validated_data.pop("tags")
         ingredients_data = validated_data.pop("ingredients")
         recipe = Recipe.objects.create(**validated_data)
+        enqueue_image_variants(recipe)
         return self._add_tags_and_ingredients(
             recipe, tags_data, ingredients_data
         )
 
     def update(self, instance, validated_data):
-        instance.ingredients.clear()
-        instance.tags.clear()
+        instance.ingredients.all().delete()
         tags_data = validated_data.pop("tags")
         ingredients_data = validated_data.pop("ingredients")
+        if not validated_data.get("image"):
+            validated_data.pop("image", None)
+        previous_image = instance.image.name
         instance = super().update(instance, validated_data)
+        # Re-sent content keeps its content-addressed name and variants.
+        if instance.image.name != previous_image:
+            enqueue_image_variants(instance)
         return self._add_tags_and_ingredients(
             instance, tags_data, ingredients_data
         )
@@ -185,22 +246,16 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         else:
             errors.append('Время приготовления не является числом')
 
-        tags = self.initial_data.get('tags')
-        uniq_tag = [0]
-        for tag in tags:
-            if uniq_tag[-1] == tag:
-                errors.append('Вы добавили одинаковые теги')
-                break
-            uniq_tag.append(tag)
-
-        ingredients = self.initial_data.get('ingredients')
-        uniq_ingr = [0]
-        for ingredient in ingredients:
-            if int(ingredient['amount']) <= 0:
-                errors.append('Количество ингредиента не может быть меньше 0')
-            if uniq_ingr[-1] == ingredient['id']:
-                errors.append('Вы добавили одинаковые ингредиенты')
-            uniq_ingr.append(ingredient['id'])
+        tags = data['tags']
+        if len({tag.id for tag in tags}) != len(tags):
+            errors.append('Вы добавили одинаковые теги')
+
+        ingredients = data['ingredients']
+        if any(item['amount'] <= 0 for item in ingredients):
+            errors.append('Количество ингредиента не может быть меньше 0')
+        ingredient_ids = {item['ingredient'].id for item in ingredients}
+        if len(ingredient_ids) != len(ingredients):
+            errors.append('Вы добавили одинаковые ингредиенты')
 
         if errors:
             raise ValidationError(errors)
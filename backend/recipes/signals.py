@@ -0,0 +1,164 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import User
+from .caching import (RECIPE_LIST_CACHE_NAMESPACE, TAG_MAP_CACHE_NAMESPACE,
+                      invalidate_cache)
+from .conditional import bump_catalog_version
+from .documents import AUTHOR_FIELDS, rebuild_recipe_documents
+from .feed import fan_out_recipe
+from .images import (acquire_image, delete_image_variants_on_commit,
+                     get_stored_image_name, release_image)
+from .models import (RECIPE_SEARCH_FIELDS, Favorite, Ingredient, Recipe,
+                     RecipeImageVariants, ShoppingCart, Tag)
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_created_recipe(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        fan_out_recipe(instance)
+
+
+@receiver(pre_save, sender=Recipe)
+def acquire_recipe_image(sender, instance, raw=False, **kwargs):
+    # Taken before the file is written so it cannot be collected under it.
+    if raw or "image" in instance.get_deferred_fields():
+        return
+    if instance._state.adding:
+        previous = ""
+    elif hasattr(instance, "_loaded_image"):
+        previous = instance._loaded_image
+    else:
+        previous = (
+            Recipe.objects.filter(pk=instance.pk)
+            .values_list("image", flat=True)
+            .first()
+        ) or ""
+    name = get_stored_image_name(instance.image)
+    if name == previous:
+        return
+    if name:
+        acquire_image(name)
+    instance._replaced_image = previous
+
+
+@receiver(post_save, sender=Recipe)
+def release_replaced_recipe_image(sender, instance, **kwargs):
+    replaced = instance.__dict__.pop("_replaced_image", "")
+    if replaced:
+        release_image(replaced)
+    if "image" not in instance.get_deferred_fields():
+        instance._loaded_image = instance.image.name or ""
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_recipe_image(sender, instance, **kwargs):
+    name = getattr(instance, "_loaded_image", "")
+    if name:
+        release_image(name)
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_recipes_on_save(sender, instance, created, update_fields,
+                               **kwargs):
+    if created or _search_text_changed(instance, update_fields):
+        # Counts of ?search= pages depend on the indexed text.
+        invalidate_cache("recipes_count")
+    invalidate_cache(RECIPE_LIST_CACHE_NAMESPACE)
+
+
+def _search_text_changed(instance, update_fields):
+    if update_fields and not set(update_fields) & set(RECIPE_SEARCH_FIELDS):
+        return False
+    text = tuple(getattr(instance, field) for field in RECIPE_SEARCH_FIELDS)
+    loaded = getattr(instance, "_loaded_search_text", None)
+    instance._loaded_search_text = text
+    return text != loaded
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipes_on_delete(sender, instance, **kwargs):
+    invalidate_cache("recipes_count")
+    invalidate_cache(RECIPE_LIST_CACHE_NAMESPACE)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_search_index(sender, instance, **kwargs):
+    get_search_backend().remove(instance.id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipes_on_tags_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_cache("recipes_count")
+        invalidate_cache(RECIPE_LIST_CACHE_NAMESPACE)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_user_recipes_count(sender, instance, **kwargs):
+    invalidate_cache("recipes_count", instance.user_id)
+
+
+def _rebuild_documents_on_commit(recipes):
+    recipe_ids = list(recipes.values_list("id", flat=True).distinct())
+    if recipe_ids:
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            updated_at=timezone.now()
+        )
+        invalidate_cache(RECIPE_LIST_CACHE_NAMESPACE)
+        transaction.on_commit(
+            lambda: rebuild_recipe_documents(
+                Recipe.objects.filter(id__in=recipe_ids)
+            )
+        )
+
+
+@receiver(post_save, sender=RecipeImageVariants)
+def rebuild_image_variants_recipe_documents(sender, instance, **kwargs):
+    _rebuild_documents_on_commit(Recipe.objects.filter(pk=instance.recipe_id))
+
+
+@receiver(post_delete, sender=RecipeImageVariants)
+def delete_image_variant_files(sender, instance, **kwargs):
+    delete_image_variants_on_commit(instance.data)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def rebuild_tag_recipe_documents(sender, instance, **kwargs):
+    _rebuild_documents_on_commit(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def rebuild_ingredient_recipe_documents(sender, instance, **kwargs):
+    _rebuild_documents_on_commit(
+        Recipe.objects.filter(ingredients__ingredient=instance)
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tags_version(sender, instance, **kwargs):
+    bump_catalog_version("tags")
+    invalidate_cache(TAG_MAP_CACHE_NAMESPACE)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_ingredients_version(sender, instance, **kwargs):
+    bump_catalog_version("ingredients")
+
+
+@receiver(post_save, sender=User)
+def rebuild_author_recipe_documents(sender, instance, update_fields, **kwargs):
+    if update_fields and not set(update_fields) & set(AUTHOR_FIELDS):
+        return
+    _rebuild_documents_on_commit(Recipe.objects.filter(author=instance))
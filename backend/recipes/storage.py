@@ -0,0 +1,42 @@
+import hashlib
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that names files by the SHA-256 of their content.
+
+    The same content always gets the same name, so a file that is already
+    stored is not written again, and a name never changes its content:
+    the files can be cached forever.
+    """
+
+    def get_content_name(self, name, content):
+        digest = getattr(content, "content_digest", None)
+        if digest is None:
+            sha256 = hashlib.sha256()
+            for chunk in content.chunks():
+                sha256.update(chunk)
+            digest = content.content_digest = sha256.hexdigest()
+        directory, basename = posixpath.split(name)
+        extension = posixpath.splitext(basename)[1].lower()
+        return posixpath.join(directory, digest + extension)
+
+    def get_available_name(self, name, max_length=None):
+        if self.exists(name):
+            raise FileExistsError(name)
+        return super().get_available_name(name, max_length)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        try:
+            return super().save(name, content, max_length)
+        except FileExistsError:
+            # Stored before or by a concurrent upload of the same content.
+            return name
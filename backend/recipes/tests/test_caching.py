@@ -0,0 +1,260 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import Subscription, User
+
+from ..caching import (TAG_MAP_CACHE_NAMESPACE, get_tag_ids_by_slug,
+                       invalidate_cache)
+from ..models import Favorite, Recipe, ShoppingCart, Tag
+from ..search import update_recipe_search_index
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class RecipeListCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest_client = APIClient()
+
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.authorized_client = APIClient()
+        cls.authorized_client.force_authenticate(cls.user)
+
+        cls.author = User.objects.create_user(username="author")
+        cls.tag_breakfast = Tag.objects.create(
+            name="test Завтрак",
+            color="#6AA84F",
+            slug="breakfast",
+        )
+        cls.recipes = []
+        for index in range(3):
+            recipe = Recipe.objects.create(
+                author=cls.author,
+                name=f"тестовый рецепт {index}",
+                image=None,
+                text="описание тестового рецепта",
+                cooking_time=4,
+            )
+            recipe.tags.add(cls.tag_breakfast)
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_cached_for_guest_client(self):
+        """Повторный запрос списка рецептов отдается из кэша."""
+        url = "/api/recipes/?tags=breakfast"
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            cached_response = self.guest_client.get(url)
+        self.assertEqual(cached_response.json(), response.json())
+
+    def test_list_cache_overlays_user_flags(self):
+        """Флаги пользователя накладываются на общий кэш одним запросом."""
+        url = "/api/recipes/"
+        self.guest_client.get(url)
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[1])
+        Subscription.objects.create(user=self.user, author=self.author)
+        with self.assertNumQueries(1):
+            response = self.authorized_client.get(url)
+        flags = {
+            recipe["id"]: (
+                recipe["is_favorited"],
+                recipe["is_in_shopping_cart"],
+                recipe["author"]["is_subscribed"],
+            )
+            for recipe in response.json()["results"]
+        }
+        self.assertEqual(
+            flags,
+            {
+                self.recipes[0].id: (True, False, True),
+                self.recipes[1].id: (False, True, True),
+                self.recipes[2].id: (False, False, True),
+            },
+        )
+        response = self.guest_client.get(url)
+        self.assertFalse(
+            any(
+                recipe["is_favorited"] or recipe["author"]["is_subscribed"]
+                for recipe in response.json()["results"]
+            )
+        )
+
+    def test_list_cache_overlays_sideloaded_authors(self):
+        """Подписка на автора накладывается на included из кэша."""
+        url = "/api/recipes/?sideload=1"
+        self.authorized_client.get(url)
+        Subscription.objects.create(user=self.user, author=self.author)
+        with self.assertNumQueries(1):
+            response = self.authorized_client.get(url)
+        self.assertEqual(
+            response.json()["included"]["authors"][0]["is_subscribed"], True
+        )
+        response = self.guest_client.get(url)
+        self.assertEqual(
+            response.json()["included"]["authors"][0]["is_subscribed"], False
+        )
+
+    def test_cached_list_not_modified(self):
+        """Закэшированный список отвечает 304 по сохранённому хешу."""
+        url = "/api/recipes/"
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        etag = self.authorized_client.get(url)["ETag"]
+        # Only the membership query, the page itself is not rebuilt.
+        with self.assertNumQueries(1):
+            response = self.authorized_client.get(
+                url, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[1])
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_cache_invalidated_on_recipe_update(self):
+        """Кэш списка сбрасывается при изменении рецепта."""
+        url = "/api/recipes/"
+        self.guest_client.get(url)
+        recipe = self.recipes[0]
+        recipe.name = "обновленный рецепт"
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        response = self.guest_client.get(url)
+        names = [recipe["name"] for recipe in response.json()["results"]]
+        self.assertIn("обновленный рецепт", names)
+
+    def test_popularity_order_follows_favorites(self):
+        """Порядок по популярности сразу учитывает новое избранное."""
+        first, second, third = (recipe.id for recipe in self.recipes)
+        for pagination in ("page", "cursor"):
+            url = f"/api/recipes/?ordering=-popularity&pagination={pagination}"
+            with self.subTest(pagination=pagination):
+                response = self.guest_client.get(url)
+                ids = [recipe["id"] for recipe in response.json()["results"]]
+                self.assertEqual(ids[0], third)
+        self.authorized_client.post(f"/api/recipes/{first}/favorite/")
+        for pagination in ("page", "cursor"):
+            url = f"/api/recipes/?ordering=-popularity&pagination={pagination}"
+            with self.subTest(pagination=pagination):
+                response = self.guest_client.get(url)
+                ids = [recipe["id"] for recipe in response.json()["results"]]
+                self.assertEqual(ids, [first, third, second])
+
+    def test_search_count_invalidated_on_recipe_update(self):
+        """Число найденных рецептов пересчитывается после правки текста."""
+        url = "/api/recipes/?search=борщ"
+        self.assertEqual(self.guest_client.get(url).json()["count"], 0)
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        recipe.name = "борщ"
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        update_recipe_search_index(recipe)
+        self.assertEqual(self.guest_client.get(url).json()["count"], 1)
+
+    def test_search_count_kept_on_other_updates(self):
+        """Правка полей вне поиска не сбрасывает кэш числа рецептов."""
+        url = "/api/recipes/"
+        self.guest_client.get(url)
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        recipe.cooking_time = 10
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        with CaptureQueriesContext(connection) as context:
+            self.guest_client.get(url)
+        for query in context.captured_queries:
+            self.assertNotIn("COUNT(", query["sql"])
+
+    def test_lost_cache_version_not_reused(self):
+        """Потерянная версия кэша не оживляет старые записи."""
+        self.assertEqual(
+            get_tag_ids_by_slug(), {"breakfast": self.tag_breakfast.id}
+        )
+        tag = Tag.objects.create(
+            name="test Обед", color="#6AA84E", slug="dinner"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_cache(TAG_MAP_CACHE_NAMESPACE)
+        self.assertIn(tag.slug, get_tag_ids_by_slug())
+        cache.delete(f"{TAG_MAP_CACHE_NAMESPACE}:version")
+        self.assertIn(tag.slug, get_tag_ids_by_slug())
+
+    def test_personal_filters_not_cached(self):
+        """Фильтры по избранному и корзине не используют общий кэш."""
+        url = "/api/recipes/?is_favorited=1"
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.json()["count"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.json()["count"], 1)
+
+    def test_recipe_flags(self):
+        """Флаги пользователя для списка рецептов — по запросу на модель."""
+        first, second, third = self.recipes
+        Favorite.objects.create(user=self.user, recipe=first)
+        ShoppingCart.objects.create(user=self.user, recipe=second)
+        Subscription.objects.create(user=self.user, author=self.author)
+        url = (
+            f"/api/recipes/flags/?ids={third.id},{first.id},{second.id},"
+            "999999"
+        )
+        # favorites, shopping cart, subscriptions
+        with self.assertNumQueries(3):
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "id": third.id,
+                    "is_favorited": False,
+                    "is_in_shopping_cart": False,
+                    "author": {"is_subscribed": True},
+                },
+                {
+                    "id": first.id,
+                    "is_favorited": True,
+                    "is_in_shopping_cart": False,
+                    "author": {"is_subscribed": True},
+                },
+                {
+                    "id": second.id,
+                    "is_favorited": False,
+                    "is_in_shopping_cart": True,
+                    "author": {"is_subscribed": True},
+                },
+                {
+                    "id": 999999,
+                    "is_favorited": False,
+                    "is_in_shopping_cart": False,
+                    "author": {"is_subscribed": False},
+                },
+            ],
+        )
+
+    def test_recipe_flags_errors(self):
+        """Флаги доступны только авторизованным и требуют список id."""
+        url = "/api/recipes/flags/"
+        response = self.guest_client.get(f"{url}?ids=1")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        for query in ("", "?ids=a", "?ids=0", "?ids=" + ",".join(["1"] * 101)):
+            with self.subTest(query=query):
+                response = self.authorized_client.get(url + query)
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
+                self.assertIn("ids", response.json())
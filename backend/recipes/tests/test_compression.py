@@ -0,0 +1,98 @@
+import gzip
+import json
+
+import brotli
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from foodgram.middleware import CompressionMiddleware, get_accepted_encodings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from ..models import Ingredient, Recipe
+
+
+class CompressionMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest_client = APIClient()
+
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.authorized_client = APIClient()
+        cls.authorized_client.force_authenticate(cls.user)
+
+        Ingredient.objects.bulk_create(
+            Ingredient(
+                name=f"test ингредиент {index}",
+                measurement_unit="г",
+            )
+            for index in range(100)
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user,
+            name="тестовый рецепт",
+            image=None,
+            text="описание тестового рецепта",
+            cooking_time=4,
+        )
+
+    def test_brotli_preferred(self):
+        """Большой ответ сжимается brotli, если клиент его принимает."""
+        response = self.guest_client.get(
+            "/api/ingredients/", HTTP_ACCEPT_ENCODING="gzip, deflate, br"
+        )
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertTrue(response["ETag"].startswith("W/"))
+        ingredients = json.loads(brotli.decompress(response.content))
+        self.assertEqual(len(ingredients), 100)
+
+    def test_gzip(self):
+        """Без поддержки brotli используется gzip."""
+        response = self.guest_client.get(
+            "/api/ingredients/", HTTP_ACCEPT_ENCODING="gzip, br;q=0"
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            int(response["Content-Length"]), len(response.content)
+        )
+        gzip.decompress(response.content)
+
+    def test_not_compressed_without_accept_encoding(self):
+        """Без Accept-Encoding ответ не сжимается."""
+        response = self.guest_client.get("/api/ingredients/")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_small_response_not_compressed(self):
+        """Короткие ответы, например 201 на избранное, не сжимаются."""
+        response = self.authorized_client.post(
+            f"/api/recipes/{self.recipe.id}/favorite/",
+            HTTP_ACCEPT_ENCODING="gzip, br",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_streaming_response(self):
+        """Потоковый ответ сжимается по частям."""
+        chunks = [f"строка {index}\n".encode() for index in range(1000)]
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="br")
+        middleware = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(
+                iter(chunks), content_type="text/plain"
+            )
+        )
+        response = middleware(request)
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(
+            brotli.decompress(b"".join(response.streaming_content)),
+            b"".join(chunks),
+        )
+
+    def test_accepted_encodings(self):
+        """Кодировки с q=0 не считаются принятыми."""
+        self.assertEqual(
+            get_accepted_encodings("gzip;q=1.0, br;q=0, identity"),
+            {"gzip", "identity"},
+        )
@@ -0,0 +1,135 @@
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from ..models import Favorite, Ingredient, Recipe, Tag
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest_client = APIClient()
+
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.authorized_client = APIClient()
+        cls.authorized_client.force_authenticate(cls.user)
+
+        cls.tag_breakfast = Tag.objects.create(
+            name="test Завтрак",
+            color="#6AA84F",
+            slug="breakfast",
+        )
+        Ingredient.objects.create(
+            name="test апельсин",
+            measurement_unit="шт.",
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user,
+            name="тестовый рецепт",
+            image=None,
+            text="описание тестового рецепта",
+            cooking_time=4,
+        )
+        cls.recipe.tags.add(cls.tag_breakfast)
+
+    def test_tags_list_not_modified(self):
+        """Список тегов отвечает 304 на совпадающий ETag."""
+        url = "/api/tags/"
+        response = self.guest_client.get(url)
+        etag = response["ETag"]
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_tags_etag_changes_on_tag_save(self):
+        """ETag списка тегов меняется при изменении тега."""
+        url = "/api/tags/"
+        etag = self.guest_client.get(url)["ETag"]
+        self.tag_breakfast.name = "test Новый завтрак"
+        self.tag_breakfast.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_ingredients_if_modified_since(self):
+        """Список ингредиентов поддерживает If-Modified-Since."""
+        url = "/api/ingredients/"
+        last_modified = self.guest_client.get(url)["Last-Modified"]
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_recipe_detail_not_modified(self):
+        """Рецепт отвечает 304 на совпадающий ETag и Last-Modified."""
+        url = f"/api/recipes/{self.recipe.id}/"
+        response = self.guest_client.get(url)
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_recipe_detail_etag_depends_on_user_flags(self):
+        """ETag рецепта меняется при добавлении рецепта в избранное."""
+        url = f"/api/recipes/{self.recipe.id}/"
+        response = self.authorized_client.get(url)
+        self.assertNotIn("Last-Modified", response)
+        etag = response["ETag"]
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()["is_favorited"])
+
+    def test_recipe_detail_etag_changes_on_update(self):
+        """ETag рецепта меняется при изменении рецепта."""
+        url = f"/api/recipes/{self.recipe.id}/"
+        etag = self.guest_client.get(url)["ETag"]
+        data = {
+            "ingredients": [
+                {"id": Ingredient.objects.get().id, "amount": 10},
+            ],
+            "tags": [self.tag_breakfast.id],
+            "name": "обновленный тестовый рецепт",
+            "text": "обновленное описание тестового рецепта",
+            "cooking_time": 21,
+        }
+        response = self.authorized_client.patch(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["name"], "обновленный тестовый рецепт"
+        )
+
+    def test_recipes_list_not_modified(self):
+        """Список рецептов отвечает 304 на совпадающий ETag."""
+        url = "/api/recipes/"
+        etag = self.guest_client.get(url)["ETag"]
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_personal_recipes_list_not_modified(self):
+        """Список избранного отвечает 304, пока избранное не изменится."""
+        url = "/api/recipes/?is_favorited=1"
+        favorite = Favorite.objects.create(user=self.user, recipe=self.recipe)
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.json()["results"][0]["id"], self.recipe.id)
+        etag = response["ETag"]
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        favorite.delete()
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"], [])
@@ -0,0 +1,194 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import (APIClient, APIRequestFactory,
+                                 force_authenticate)
+
+from users.models import Subscription, User
+
+from ..documents import (get_recipe_documents, get_recipe_fields,
+                         rebuild_recipe_documents, render_recipe_document)
+from ..fast_serializers import (get_recipe_rows, serialize_recipe_rows,
+                                serialize_sideloaded_recipe_rows)
+from ..models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                      ShoppingCart, Tag)
+from ..serializers import RecipeReadSerializer
+from ..views import RecipeViewSet
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class FastRecipeSerializerTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.author = User.objects.create_user(
+            email="vasya_pupkin@mail.com",
+            username="vasya_pupkin",
+            first_name="Vasya",
+            last_name="Pupkin",
+        )
+        Subscription.objects.create(user=cls.user, author=cls.author)
+        tags = [
+            Tag.objects.create(
+                name=f"test тег {index}",
+                color=f"#00000{index}",
+                slug=f"tag_{index}",
+            )
+            for index in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f"test ингредиент {index}",
+                measurement_unit="г",
+            )
+            for index in range(3)
+        ]
+        uploaded = SimpleUploadedFile(
+            name="small.gif",
+            content=(
+                b"\x47\x49\x46\x38\x39\x61\x02\x00"
+                b"\x01\x00\x80\x00\x00\x00\x00\x00"
+                b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+                b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+                b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+                b"\x0A\x00\x3B"
+            ),
+            content_type="image/gif",
+        )
+        for index in range(6):
+            recipe = Recipe.objects.create(
+                author=(cls.user, cls.author)[index % 2],
+                name=f"тестовый рецепт {index}",
+                image=uploaded if index % 3 else None,
+                text=f"описание тестового рецепта {index}",
+                cooking_time=index + 1,
+            )
+            recipe.tags.add(*reversed(tags[: index % 3 + 1]))
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(
+                    recipe=recipe, ingredient=ingredient, amount=index + 1
+                )
+                for ingredient in reversed(ingredients[: index % 4])
+            )
+            if index % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if index % 3 == 0:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def _get_request(self, user=None, query=""):
+        request = APIRequestFactory().get(f"/api/recipes/{query}")
+        if user is not None:
+            force_authenticate(request, user=user)
+        view = RecipeViewSet(action="list", format_kwarg=None)
+        view.request = Request(request)
+        return view.request, view.get_queryset()
+
+    def _assert_same_json(self, user=None, query=""):
+        request, queryset = self._get_request(user, query)
+        fields = get_recipe_fields(request)
+        expected = RecipeReadSerializer(
+            queryset, many=True, context={"request": request}
+        ).data
+        actual = serialize_recipe_rows(
+            get_recipe_rows(queryset, fields), request, fields
+        )
+        self.assertEqual(
+            JSONRenderer().render(actual), JSONRenderer().render(expected)
+        )
+
+    def test_same_json_guest(self):
+        """Быстрый сериализатор совпадает с сериализатором DRF для гостя."""
+        self._assert_same_json()
+
+    def test_same_json_authorized(self):
+        """Быстрый сериализатор совпадает с сериализатором DRF с флагами."""
+        self._assert_same_json(self.user)
+
+    def test_same_json_with_fields(self):
+        """Быстрый сериализатор учитывает параметры fields и omit."""
+        self._assert_same_json(self.user, "?omit=ingredients,text")
+        self._assert_same_json(self.user, "?fields=name,author,image")
+
+    def test_recipe_document_same_json(self):
+        """Документ рецепта совпадает с сериализатором DRF."""
+        rebuild_recipe_documents(Recipe.objects.all())
+        request, queryset = self._get_request(self.user)
+        documents = get_recipe_documents(request.user)
+        for recipe in queryset:
+            with self.subTest(recipe=recipe.id):
+                expected = RecipeReadSerializer(
+                    recipe, context={"request": request}
+                ).data
+                actual = render_recipe_document(
+                    documents.get(recipe_id=recipe.id), request
+                )
+                self.assertEqual(
+                    JSONRenderer().render(actual),
+                    JSONRenderer().render(expected),
+                )
+
+    def _denormalize(self, recipes, included):
+        authors = {author["id"]: author for author in included["authors"]}
+        tags = {tag["id"]: tag for tag in included["tags"]}
+        ingredients = {
+            ingredient["id"]: ingredient
+            for ingredient in included["ingredients"]
+        }
+        for recipe in recipes:
+            recipe["author"] = authors[recipe["author"]]
+            recipe["tags"] = [tags[tag_id] for tag_id in recipe["tags"]]
+            recipe["ingredients"] = [
+                {
+                    **ingredients[item["ingredient"]],
+                    "id": item["id"],
+                    "amount": item["amount"],
+                }
+                for item in recipe["ingredients"]
+            ]
+        return recipes
+
+    def test_sideloaded_same_json(self):
+        """Связанные объекты выносятся в included по одному разу."""
+        request, queryset = self._get_request(self.user, "?sideload=1")
+        fields = get_recipe_fields(request)
+        expected = RecipeReadSerializer(
+            queryset, many=True, context={"request": request}
+        ).data
+        recipes, included = serialize_sideloaded_recipe_rows(
+            get_recipe_rows(queryset, fields), request, fields
+        )
+        self.assertEqual(len(included["authors"]), 2)
+        self.assertEqual(len(included["tags"]), 3)
+        self.assertEqual(len(included["ingredients"]), 3)
+        self.assertEqual(
+            JSONRenderer().render(self._denormalize(recipes, included)),
+            JSONRenderer().render(expected),
+        )
+
+    def test_sideloaded_response(self):
+        """Список рецептов отдаётся с included по параметру sideload."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get("/api/recipes/?sideload=1&omit=ingredients").json()
+        self.assertEqual(data["count"], 6)
+        self.assertEqual(set(data["included"]), {"authors", "tags"})
+        self.assertEqual(
+            {
+                author["id"]: author["is_subscribed"]
+                for author in data["included"]["authors"]
+            },
+            {self.user.id: False, self.author.id: True},
+        )
+        self.assertIsInstance(data["results"][0]["author"], int)
@@ -0,0 +1,117 @@
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import Subscription, User
+
+from ..models import FeedEntry, Recipe
+
+
+class RecipeFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest_client = APIClient()
+
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.authorized_client = APIClient()
+        cls.authorized_client.force_authenticate(cls.user)
+
+        cls.authors = [
+            User.objects.create_user(
+                username=f"author_{index}",
+                email=f"author_{index}@example.com",
+            )
+            for index in range(3)
+        ]
+        for index in range(6):
+            cls._create_recipe(cls.authors[index % 3], index)
+
+    @classmethod
+    def _create_recipe(cls, author, index):
+        return Recipe.objects.create(
+            author=author,
+            name=f"тестовый рецепт {index}",
+            image=None,
+            text="описание тестового рецепта",
+            cooking_time=4,
+        )
+
+    def _subscribe(self, author):
+        response = self.authorized_client.post(
+            f"/api/users/{author.id}/subscribe/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def _get_feed_ids(self, url="/api/recipes/feed/?limit=100"):
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe["id"] for recipe in response.json()["results"]]
+
+    def _get_author_recipe_ids(self, *authors):
+        return list(
+            Recipe.objects.filter(author__in=authors)
+            .order_by("-id")
+            .values_list("id", flat=True)
+        )
+
+    def test_feed_guest_client(self):
+        """Лента недоступна анониму."""
+        response = self.guest_client.get("/api/recipes/feed/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_feed_backfilled_on_subscribe(self):
+        """Подписка переносит рецепты автора в ленту."""
+        self.assertEqual(self._get_feed_ids(), [])
+        self._subscribe(self.authors[0])
+        self._subscribe(self.authors[2])
+        self.assertEqual(
+            self._get_feed_ids(),
+            self._get_author_recipe_ids(self.authors[0], self.authors[2]),
+        )
+
+    def test_feed_fan_out_on_recipe_create(self):
+        """Новый рецепт автора попадает в ленты подписчиков."""
+        self._subscribe(self.authors[0])
+        recipe = self._create_recipe(self.authors[0], 100)
+        self._create_recipe(self.authors[1], 101)
+        self.assertEqual(self._get_feed_ids()[0], recipe.id)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.user).count(), 3
+        )
+
+    def test_feed_pruned_on_unsubscribe(self):
+        """Отписка убирает рецепты автора из ленты."""
+        self._subscribe(self.authors[0])
+        self._subscribe(self.authors[1])
+        response = self.authorized_client.delete(
+            f"/api/users/{self.authors[0].id}/subscribe/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self._get_feed_ids(),
+            self._get_author_recipe_ids(self.authors[1]),
+        )
+
+    def test_feed_keyset_pagination(self):
+        """Лента листается курсором без пропусков и повторов."""
+        for author in self.authors:
+            Subscription.objects.create(user=self.user, author=author)
+        url = "/api/recipes/feed/?limit=4"
+        recipes_id = []
+        while url:
+            response = self.authorized_client.get(url)
+            data = response.json()
+            self.assertNotIn("count", data)
+            recipes_id.extend(recipe["id"] for recipe in data["results"])
+            url = data["next"]
+        self.assertEqual(
+            recipes_id, self._get_author_recipe_ids(*self.authors)
+        )
+
+    def test_feed_queries(self):
+        """Лента читается фиксированным числом запросов."""
+        for author in self.authors:
+            Subscription.objects.create(user=self.user, author=author)
+        # recipes with authors and flags, tags, ingredients, subscriptions
+        with self.assertNumQueries(4):
+            self._get_feed_ids()
@@ -0,0 +1,454 @@
+import base64
+import hashlib
+import io
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from ..images import (MAX_JOB_ATTEMPTS, PLACEHOLDER, enqueue_image_variants,
+                      get_image_storage, process_image_jobs)
+from ..models import (Ingredient, Recipe, RecipeImageJob, RecipeImageVariants,
+                      StoredImage, Tag)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_png(width, height):
+    return make_image(width, height, "PNG")
+
+
+def make_image(width, height, image_format):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(
+        buffer, image_format
+    )
+    return buffer.getvalue()
+
+
+def make_png_bomb(width, height):
+    """PNG с огромным заявленным размером и одной строкой сжатых нулей."""
+
+    def chunk(kind, data):
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data))
+        )
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(bytes(width * 3 + 1), 9))
+        + chunk(b"IEND", b"")
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RecipeImageVariantsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.authorized_client = APIClient()
+        cls.authorized_client.force_authenticate(cls.user)
+        cls.tag = Tag.objects.create(
+            name="test Завтрак", color="#6AA84FFF", slug="breakfast"
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name="test апельсин", measurement_unit="шт."
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.recipe = Recipe.objects.create(
+            author=self.user,
+            name="тестовый рецепт",
+            image=SimpleUploadedFile(
+                "big.png", make_png(1600, 1200), content_type="image/png"
+            ),
+            text="описание тестового рецепта",
+            cooking_time=4,
+        )
+        self.recipe.ingredients.create(ingredient=self.ingredient, amount=2)
+        self.recipe.tags.add(self.tag)
+
+    def _get_recipe_data(self):
+        return {
+            "ingredients": [{"id": self.ingredient.id, "amount": 3}],
+            "tags": [self.tag.id],
+            "image": (
+                "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMA"
+                + "AABieywaAAAACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAO"
+                + "xAGVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJRU5ErkJggg=="
+            ),
+            "name": "новый рецепт",
+            "text": "описание",
+            "cooking_time": 5,
+        }
+
+    def _process(self, executor):
+        with self.captureOnCommitCallbacks(execute=True):
+            return process_image_jobs(executor)
+
+    def _get_detail(self):
+        response = self.authorized_client.get(
+            f"/api/recipes/{self.recipe.id}/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_variants_built_on_process_pool(self):
+        """Варианты картинки строятся в пуле процессов и попадают в API."""
+        enqueue_image_variants(self.recipe)
+        self.assertIsNone(self._get_detail()["image_variants"])
+
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            self.assertEqual(self._process(executor), 1)
+
+        self.assertFalse(RecipeImageJob.objects.exists())
+        data = RecipeImageVariants.objects.get(recipe=self.recipe).data
+        storage = get_image_storage()
+        for size, bounds in (("card", 640), ("detail", 1280)):
+            self.assertEqual(set(data[size]), {"jpeg", "webp"})
+            for name in data[size].values():
+                with Image.open(storage.open(name)) as image:
+                    self.assertEqual(max(image.size), bounds)
+        self.assertTrue(
+            data[PLACEHOLDER].startswith("data:image/jpeg;base64,")
+        )
+
+        variants = self._get_detail()["image_variants"]
+        self.assertEqual(
+            variants["card"]["webp"],
+            "http://testserver" + storage.url(data["card"]["webp"]),
+        )
+        self.assertEqual(variants[PLACEHOLDER], data[PLACEHOLDER])
+        response = self.authorized_client.get("/api/recipes/")
+        self.assertEqual(
+            response.json()["results"][0]["image_variants"], variants
+        )
+        response = self.authorized_client.post(
+            f"/api/recipes/{self.recipe.id}/favorite/"
+        )
+        self.assertEqual(response.json()["image_variants"], variants)
+
+    def test_stale_variants_hidden_until_rebuilt(self):
+        """После смены картинки старые варианты не отдаются и удаляются."""
+        enqueue_image_variants(self.recipe)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self._process(executor)
+            old_names = set(
+                RecipeImageVariants.objects.get(recipe=self.recipe)
+                .data["card"]
+                .values()
+            )
+            data = self._get_recipe_data()
+            response = self.authorized_client.patch(
+                f"/api/recipes/{self.recipe.id}/", data, format="json"
+            )
+            self.assertIsNone(response.json()["image_variants"])
+            self.assertIsNone(self._get_detail()["image_variants"])
+            self._process(executor)
+
+        variants = self._get_detail()["image_variants"]
+        self.assertIsNotNone(variants)
+        self.assertFalse(
+            old_names & set(
+                RecipeImageVariants.objects.get(recipe=self.recipe)
+                .data["card"]
+                .values()
+            )
+        )
+        for name in old_names:
+            self.assertFalse(get_image_storage().exists(name))
+
+    def test_variant_files_deleted_with_recipe(self):
+        """Файлы вариантов удаляются вместе с рецептом."""
+        enqueue_image_variants(self.recipe)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self._process(executor)
+        data = RecipeImageVariants.objects.get(recipe=self.recipe).data
+        names = [
+            name
+            for size, formats in data.items()
+            if size != PLACEHOLDER
+            for name in formats.values()
+        ]
+        self.assertTrue(names)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.authorized_client.delete(
+                f"/api/recipes/{self.recipe.id}/"
+            )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        for name in names:
+            self.assertFalse(default_storage.exists(name))
+
+    def test_broken_image_retried_and_given_up(self):
+        """Битая картинка оставляет ошибку и перестаёт обрабатываться."""
+        self.recipe.image = SimpleUploadedFile("broken.png", b"not an image")
+        self.recipe.save()
+        enqueue_image_variants(self.recipe)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            for _ in range(MAX_JOB_ATTEMPTS):
+                self.assertEqual(self._process(executor), 1)
+            self.assertEqual(self._process(executor), 0)
+        job = RecipeImageJob.objects.get(recipe=self.recipe)
+        self.assertEqual(job.attempts, MAX_JOB_ATTEMPTS)
+        self.assertIn("UnidentifiedImageError", job.error)
+        self.assertFalse(RecipeImageVariants.objects.exists())
+
+    def test_api_writes_enqueue_only_new_images(self):
+        """Задача ставится при новой картинке, но не при PATCH без неё."""
+        data = self._get_recipe_data()
+        response = self.authorized_client.post(
+            "/api/recipes/", data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(pk=response.json()["id"])
+        self.assertEqual(recipe.image_job.image, recipe.image.name)
+
+        RecipeImageJob.objects.all().delete()
+        del data["image"]
+        response = self.authorized_client.patch(
+            f"/api/recipes/{recipe.id}/", data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(RecipeImageJob.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RecipeImageUploadTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.authorized_client = APIClient()
+        cls.authorized_client.force_authenticate(cls.user)
+        cls.tag = Tag.objects.create(
+            name="test Завтрак", color="#6AA84FFF", slug="breakfast"
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name="test апельсин", measurement_unit="шт."
+        )
+
+    def _get_form_data(self, image):
+        return {
+            "ingredients[0]id": self.ingredient.id,
+            "ingredients[0]amount": 3,
+            "tags": [self.tag.id],
+            "image": image,
+            "name": "новый рецепт",
+            "text": "описание",
+            "cooking_time": 5,
+        }
+
+    def _post_file(self, content, name="image.png"):
+        return self.authorized_client.post(
+            "/api/recipes/",
+            self._get_form_data(SimpleUploadedFile(name, content)),
+            format="multipart",
+        )
+
+    def _post_base64(self, content):
+        data = self._get_form_data(
+            "data:image/png;base64," + base64.b64encode(content).decode()
+        )
+        del data["ingredients[0]id"], data["ingredients[0]amount"]
+        data["ingredients"] = [{"id": self.ingredient.id, "amount": 3}]
+        return self.authorized_client.post(
+            "/api/recipes/", data, format="json"
+        )
+
+    def _assert_image_error(self, response, message):
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"image": [message]})
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_multipart_upload(self):
+        """Рецепт создаётся из multipart-формы с файлом картинки."""
+        content = make_image(40, 30, "JPEG")
+        response = self._post_file(content, name="../../photo.png")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get()
+        self.assertRegex(
+            recipe.image.name, r"^recipes/images/[0-9a-f]{64}\.jpg$"
+        )
+        with recipe.image.open() as file:
+            self.assertEqual(file.read(), content)
+        self.assertEqual(recipe.image_job.image, recipe.image.name)
+        self.assertEqual(
+            list(recipe.ingredients.values_list("ingredient", "amount")),
+            [(self.ingredient.id, 3)],
+        )
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+
+    def test_base64_upload_still_supported(self):
+        """Картинка в base64 внутри JSON по-прежнему принимается."""
+        response = self._post_base64(make_image(40, 30, "GIF"))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Recipe.objects.get().image.name.endswith(".gif"))
+
+    @override_settings(FILE_UPLOAD_MAX_SIZE=1000)
+    def test_size_limit(self):
+        """Слишком большой файл отклоняется и в форме, и в base64."""
+        content = os.urandom(2000)
+        response = self._post_file(content)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("больше 1000 байт", response.json()["detail"])
+        self._assert_image_error(
+            self._post_base64(content),
+            "Размер картинки больше 1000 байт.",
+        )
+
+    def test_decompression_bomb_rejected(self):
+        """Картинка с огромным заявленным размером не декодируется."""
+        message = "В картинке больше 40000000 пикселей."
+        for width, height in ((8000, 8000), (100000, 100000)):
+            with self.subTest(width=width, height=height):
+                self._assert_image_error(
+                    self._post_file(make_png_bomb(width, height)), message
+                )
+                self._assert_image_error(
+                    self._post_base64(make_png_bomb(width, height)),
+                    message,
+                )
+
+    def test_invalid_images_rejected(self):
+        """Не картинки, чужие форматы и битый base64 отклоняются."""
+        self._assert_image_error(
+            self._post_file(make_image(4, 4, "BMP")),
+            "Картинка должна быть в формате JPEG, PNG, GIF или WebP.",
+        )
+        self._assert_image_error(
+            self._post_file(b"not an image"),
+            "Загрузите правильное изображение. Файл, который вы загрузили, "
+            "поврежден или не является изображением.",
+        )
+        response = self.authorized_client.post(
+            "/api/recipes/",
+            {**self._get_form_data("data:image/png;base64,@@@"),
+             "ingredients": [{"id": self.ingredient.id, "amount": 3}]},
+            format="json",
+        )
+        self._assert_image_error(response, "Картинка в base64 повреждена.")
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedImageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.authorized_client = APIClient()
+        cls.authorized_client.force_authenticate(cls.user)
+        cls.tag = Tag.objects.create(
+            name="test Завтрак", color="#6AA84FFF", slug="breakfast"
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name="test апельсин", measurement_unit="шт."
+        )
+        cls.content = make_image(30, 20, "PNG")
+        cls.name = (
+            f"recipes/images/{hashlib.sha256(cls.content).hexdigest()}.png"
+        )
+
+    def _get_recipe_data(self, content):
+        return {
+            "ingredients": [{"id": self.ingredient.id, "amount": 3}],
+            "tags": [self.tag.id],
+            "image": (
+                "data:image/png;base64," + base64.b64encode(content).decode()
+            ),
+            "name": "новый рецепт",
+            "text": "описание",
+            "cooking_time": 5,
+        }
+
+    def _create_recipe(self, content):
+        response = self.authorized_client.post(
+            "/api/recipes/", self._get_recipe_data(content), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Recipe.objects.get(pk=response.json()["id"])
+
+    def _get_references(self, name):
+        return (
+            StoredImage.objects.filter(name=name)
+            .values_list("references", flat=True)
+            .first()
+        )
+
+    def test_same_image_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом с именем по хешу."""
+        storage = get_image_storage()
+        first = self._create_recipe(self.content)
+        files = storage.listdir("recipes/images")[1]
+        second = self._create_recipe(self.content)
+        self.assertEqual(first.image.name, self.name)
+        self.assertEqual(second.image.name, self.name)
+        self.assertEqual(self._get_references(self.name), 2)
+        self.assertIn(os.path.basename(self.name), files)
+        self.assertEqual(storage.listdir("recipes/images")[1], files)
+
+    def test_unchanged_image_not_rewritten(self):
+        """PUT с той же картинкой не перезаписывает файл и счётчик."""
+        recipe = self._create_recipe(self.content)
+        RecipeImageJob.objects.all().delete()
+        path = get_image_storage().path(self.name)
+        before = os.stat(path)
+        response = self.authorized_client.put(
+            f"/api/recipes/{recipe.id}/",
+            self._get_recipe_data(self.content),
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        after = os.stat(path)
+        self.assertEqual(
+            (after.st_ino, after.st_mtime_ns),
+            (before.st_ino, before.st_mtime_ns),
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, self.name)
+        self.assertEqual(self._get_references(self.name), 1)
+        self.assertFalse(RecipeImageJob.objects.exists())
+
+    def test_file_deleted_with_last_reference(self):
+        """Файл удаляется, когда на него не остаётся ссылок."""
+        first = self._create_recipe(self.content)
+        second = self._create_recipe(self.content)
+        other_content = make_image(20, 30, "PNG")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.authorized_client.put(
+                f"/api/recipes/{first.id}/",
+                self._get_recipe_data(other_content),
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        self.assertEqual(self._get_references(first.image.name), 1)
+        self.assertEqual(self._get_references(self.name), 1)
+        self.assertTrue(get_image_storage().exists(self.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.authorized_client.delete(
+                f"/api/recipes/{second.id}/"
+            )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertIsNone(self._get_references(self.name))
+        self.assertFalse(get_image_storage().exists(self.name))
+        self.assertTrue(get_image_storage().exists(first.image.name))
@@ -0,0 +1,80 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MoveIngredientsToRecipesTest(TransactionTestCase):
+    migrate_from = [("recipes", "0006_feedentry")]
+    migrate_to = [("recipes", "0007_ingredientamount_recipe")]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        users = apps.get_model("auth", "User").objects
+        ingredients = apps.get_model("recipes", "Ingredient").objects
+        amounts = apps.get_model("recipes", "IngredientAmount").objects
+        recipes = apps.get_model("recipes", "Recipe").objects
+        documents = apps.get_model("recipes", "RecipeDocument").objects
+
+        author = users.create(username="author")
+        ingredient = ingredients.create(
+            name="test свекла", measurement_unit="шт."
+        )
+        self.shared_id = amounts.create(
+            ingredient=ingredient, amount=2
+        ).id
+        self.recipe_ids = []
+        self.updated_at = {}
+        for index in range(2):
+            recipe = recipes.create(
+                author=author,
+                name=f"тестовый рецепт {index}",
+                text="описание тестового рецепта",
+                cooking_time=4,
+            )
+            recipe.ingredients.add(self.shared_id)
+            documents.create(
+                recipe=recipe,
+                data={"ingredients": [{"id": self.shared_id}]},
+            )
+            self.recipe_ids.append(recipe.id)
+            self.updated_at[recipe.id] = recipe.updated_at
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        self.apps = executor.loader.project_state(self.migrate_to).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_shared_ingredient_copied(self):
+        """Общая строка ингредиента копируется, устаревший документ удален."""
+        amounts = self.apps.get_model("recipes", "IngredientAmount").objects
+        recipes = self.apps.get_model("recipes", "Recipe").objects
+        documents = self.apps.get_model("recipes", "RecipeDocument").objects
+        first_id, second_id = self.recipe_ids
+
+        self.assertEqual(
+            amounts.get(recipe_id=first_id).id,
+            self.shared_id,
+        )
+        copy = amounts.get(recipe_id=second_id)
+        self.assertNotEqual(copy.id, self.shared_id)
+        self.assertEqual(copy.amount, 2)
+
+        self.assertTrue(
+            documents.filter(recipe_id=first_id).exists()
+        )
+        self.assertFalse(
+            documents.filter(recipe_id=second_id).exists()
+        )
+        self.assertEqual(
+            recipes.get(id=first_id).updated_at,
+            self.updated_at[first_id],
+        )
+        self.assertGreater(
+            recipes.get(id=second_id).updated_at,
+            self.updated_at[second_id],
+        )
@@ -0,0 +1,242 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from ..models import Favorite, Recipe, Tag
+
+RECIPES_COUNT = 30
+
+
+class RecipePaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest_client = APIClient()
+
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.authorized_client = APIClient()
+        cls.authorized_client.force_authenticate(cls.user)
+
+        cls.tag_breakfast = Tag.objects.create(
+            name="test Завтрак",
+            color="#6AA84F",
+            slug="breakfast",
+        )
+        cls.tag_dinner = Tag.objects.create(
+            name="test Обед",
+            color="#6AA84E",
+            slug="dinner",
+        )
+        for index in range(RECIPES_COUNT):
+            recipe = Recipe.objects.create(
+                author=cls.user,
+                name=f"тестовый рецепт {index}",
+                image=None,
+                text="описание тестового рецепта",
+                cooking_time=4,
+            )
+            recipe.tags.add(cls.tag_breakfast)
+            if index % 2:
+                recipe.tags.add(cls.tag_dinner)
+            if index % 3 == 0:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+
+    def _walk_cursor_pages(self, client, url):
+        recipes_id = []
+        pages = 0
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            self.assertNotIn("count", data)
+            recipes_id += [recipe["id"] for recipe in data["results"]]
+            url = data["next"]
+            pages += 1
+        return recipes_id, pages
+
+    def test_page_number_pagination_by_default(self):
+        """По умолчанию используется постраничная пагинация."""
+        response = self.guest_client.get("/api/recipes/?limit=5")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["count"], RECIPES_COUNT)
+        self.assertEqual(len(data["results"]), 5)
+        self.assertIn("page=2", data["next"])
+
+    def test_cursor_pagination_returns_all_recipes(self):
+        """Курсорная пагинация возвращает все рецепты по убыванию id."""
+        recipes_id, pages = self._walk_cursor_pages(
+            self.guest_client, "/api/recipes/?pagination=cursor&limit=7"
+        )
+        self.assertEqual(pages, 5)
+        self.assertEqual(
+            recipes_id,
+            list(Recipe.objects.values_list("id", flat=True)),
+        )
+
+    def test_cursor_pagination_with_filters(self):
+        """Курсорная пагинация работает вместе с фильтрами рецептов."""
+        urls = {
+            "tags=dinner": Recipe.objects.filter(tags=self.tag_dinner),
+            "tags=breakfast&tags=dinner": Recipe.objects.filter(
+                tags__in=(self.tag_breakfast, self.tag_dinner)
+            ).distinct(),
+            f"author={self.user.id}&is_favorited=1": Recipe.objects.filter(
+                favorites__user=self.user
+            ),
+        }
+        for query, queryset in urls.items():
+            with self.subTest(query=query):
+                recipes_id, _ = self._walk_cursor_pages(
+                    self.authorized_client,
+                    f"/api/recipes/?pagination=cursor&limit=4&{query}",
+                )
+                self.assertEqual(
+                    sorted(set(recipes_id)),
+                    sorted(queryset.values_list("id", flat=True)),
+                )
+
+    def test_cursor_pagination_with_ordering(self):
+        """Курсорная пагинация сохраняет сортировку по популярности."""
+        for index, recipe in enumerate(Recipe.objects.order_by("id")[:6]):
+            Recipe.objects.filter(pk=recipe.pk).update(
+                favorites_count=index % 3
+            )
+        for ordering in ("popularity", "-popularity"):
+            with self.subTest(ordering=ordering):
+                response = self.guest_client.get(
+                    f"/api/recipes/?limit=100&ordering={ordering}"
+                )
+                expected = [
+                    recipe["id"] for recipe in response.json()["results"]
+                ]
+                recipes_id, _ = self._walk_cursor_pages(
+                    self.guest_client,
+                    "/api/recipes/?pagination=cursor&limit=4"
+                    f"&ordering={ordering}",
+                )
+                self.assertEqual(recipes_id, expected)
+
+    def test_cursor_pagination_unsupported_filters(self):
+        """Поиск и выборка по ids не сочетаются с курсорной пагинацией."""
+        for query in ("search=рецепт", "ids=1,4,2"):
+            with self.subTest(query=query):
+                response = self.guest_client.get(
+                    f"/api/recipes/?pagination=cursor&{query}"
+                )
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
+                self.assertIn(query.partition("=")[0], response.json())
+
+    def test_cursor_pagination_deep_page_queries(self):
+        """Глубокая страница курсорной пагинации не дороже первой."""
+        url = "/api/recipes/?pagination=cursor&limit=3"
+        with self.assertNumQueries(3):
+            response = self.guest_client.get(url)
+        url = response.json()["next"]
+        for _ in range(5):
+            url = self.guest_client.get(url).json()["next"]
+        with self.assertNumQueries(3):
+            response = self.guest_client.get(url)
+        self.assertEqual(len(response.json()["results"]), 3)
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class CachedCountPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest_client = APIClient()
+
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.authorized_client = APIClient()
+        cls.authorized_client.force_authenticate(cls.user)
+
+        for index in range(RECIPES_COUNT):
+            Recipe.objects.create(
+                author=cls.user,
+                name=f"тестовый рецепт {index}",
+                image=None,
+                text="описание тестового рецепта",
+                cooking_time=4,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def _create_recipe(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Recipe.objects.create(
+                author=self.user,
+                name="новый рецепт",
+                image=None,
+                text="описание нового рецепта",
+                cooking_time=4,
+            )
+
+    def test_count_is_cached(self):
+        """Количество рецептов считается один раз для набора фильтров."""
+        url = f"/api/recipes/?limit=5&author={self.user.id}"
+        # author choice, count, recipes, tags, ingredients
+        with self.assertNumQueries(5):
+            response = self.guest_client.get(url)
+        self.assertEqual(response.json()["count"], RECIPES_COUNT)
+        with self.assertNumQueries(4):
+            response = self.guest_client.get(f"{url}&page=2")
+        self.assertEqual(response.json()["count"], RECIPES_COUNT)
+
+    def test_count_cache_invalidated_on_create_and_delete(self):
+        """Кэш количества сбрасывается при создании и удалении рецепта."""
+        url = "/api/recipes/?limit=5"
+        self.guest_client.get(url)
+        recipe = self._create_recipe()
+        response = self.guest_client.get(url)
+        self.assertEqual(response.json()["count"], RECIPES_COUNT + 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        response = self.guest_client.get(url)
+        self.assertEqual(response.json()["count"], RECIPES_COUNT)
+
+    def test_count_cache_is_personal_for_user_filters(self):
+        """Количество для фильтров пользователя кэшируется отдельно."""
+        url = "/api/recipes/?is_favorited=1"
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.json()["count"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(
+                user=self.user, recipe=Recipe.objects.first()
+            )
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.json()["count"], 1)
+
+    def test_pagination_without_count(self):
+        """Без подсчета количества страница выбирается без COUNT(*)."""
+        url = "/api/recipes/?limit=7&count=0"
+        # recipes, tags, ingredients
+        with self.assertNumQueries(3):
+            response = self.guest_client.get(url)
+        data = response.json()
+        self.assertEqual(
+            list(data), ["count", "next", "previous", "results"]
+        )
+        self.assertEqual(data["count"], 8)
+        self.assertIn("page=2", data["next"])
+        self.assertIsNone(data["previous"])
+
+        response = self.guest_client.get(f"{url}&page=5")
+        data = response.json()
+        self.assertEqual(data["count"], RECIPES_COUNT)
+        self.assertEqual(len(data["results"]), 2)
+        self.assertIsNone(data["next"])
+        self.assertIn("page=4", data["previous"])
+
+        response = self.guest_client.get(f"{url}&page=6")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,121 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from ..models import Favorite, Recipe
+
+
+class PopularityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest_client = APIClient()
+
+        cls.users = [
+            User.objects.create_user(username=f"user_{index}")
+            for index in range(3)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.users[0],
+                name=f"тестовый рецепт {index}",
+                image=None,
+                text="описание тестового рецепта",
+                cooking_time=4,
+            )
+            for index in range(3)
+        ]
+
+    def _get_client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def _get_favorites_count(self, recipe):
+        recipe.refresh_from_db(fields=("favorites_count",))
+        return recipe.favorites_count
+
+    def test_favorites_count_follows_favorites(self):
+        """Счётчик избранного меняется при добавлении и удалении."""
+        recipe = self.recipes[0]
+        url = f"/api/recipes/{recipe.id}/favorite/"
+        for user in self.users:
+            response = self._get_client(user).post(url)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._get_favorites_count(recipe), 3)
+        response = self._get_client(self.users[0]).post(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._get_favorites_count(recipe), 3)
+        response = self._get_client(self.users[0]).delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self._get_favorites_count(recipe), 2)
+
+    def test_shopping_cart_does_not_change_favorites_count(self):
+        """Корзина не влияет на счётчик избранного."""
+        recipe = self.recipes[0]
+        url = f"/api/recipes/{recipe.id}/shopping_cart/"
+        self._get_client(self.users[0]).post(url)
+        self.assertEqual(self._get_favorites_count(recipe), 0)
+
+    def test_favorites_count_never_negative(self):
+        """Удаление при разошедшемся счётчике не уводит его в минус."""
+        recipe = self.recipes[0]
+        Favorite.objects.create(user=self.users[0], recipe=recipe)
+        response = self._get_client(self.users[0]).delete(
+            f"/api/recipes/{recipe.id}/favorite/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self._get_favorites_count(recipe), 0)
+
+    def test_recipe_save_keeps_favorites_count(self):
+        """Сохранение рецепта не затирает счётчик, выросший после чтения."""
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        response = self._get_client(self.users[1]).post(
+            f"/api/recipes/{recipe.id}/favorite/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipe.name = "обновленный рецепт"
+        recipe.save()
+        self.assertEqual(self._get_favorites_count(recipe), 1)
+        self.assertEqual(
+            Recipe.objects.get(pk=recipe.pk).name, "обновленный рецепт"
+        )
+
+    def test_ordering_by_popularity(self):
+        """Рецепты сортируются по популярности."""
+        for count, recipe in zip((2, 0, 1), self.recipes):
+            Recipe.objects.filter(id=recipe.id).update(favorites_count=count)
+        response = self.guest_client.get("/api/recipes/?ordering=-popularity")
+        self.assertEqual(
+            [recipe["id"] for recipe in response.json()["results"]],
+            [self.recipes[0].id, self.recipes[2].id, self.recipes[1].id],
+        )
+        response = self.guest_client.get("/api/recipes/?ordering=popularity")
+        self.assertEqual(
+            [recipe["id"] for recipe in response.json()["results"]],
+            [self.recipes[1].id, self.recipes[2].id, self.recipes[0].id],
+        )
+        response = self.guest_client.get("/api/recipes/?ordering=name")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reconcile_favorites_count(self):
+        """Команда сверки исправляет разошедшиеся счётчики."""
+        Favorite.objects.create(user=self.users[0], recipe=self.recipes[0])
+        Favorite.objects.create(user=self.users[1], recipe=self.recipes[0])
+        Recipe.objects.filter(id=self.recipes[1].id).update(
+            favorites_count=5
+        )
+        out = StringIO()
+        call_command("reconcile_favorites_count", "--dry-run", stdout=out)
+        self.assertIn("Recipes with drift: 2", out.getvalue())
+        self.assertEqual(self._get_favorites_count(self.recipes[0]), 0)
+        call_command("reconcile_favorites_count", stdout=StringIO())
+        self.assertEqual(self._get_favorites_count(self.recipes[0]), 2)
+        self.assertEqual(self._get_favorites_count(self.recipes[1]), 0)
+        out = StringIO()
+        call_command("reconcile_favorites_count", stdout=out)
+        self.assertIn("Recipes with drift: 0", out.getvalue())
@@ -0,0 +1,377 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import Subscription, User
+
+from ..models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                      RecipeDocument, Tag)
+from ..search import get_search_backend
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+RECIPES_COUNT = 100
+UPDATE_INGREDIENTS_COUNT = 30
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RecipeQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest_client = APIClient()
+
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.authorized_client = APIClient()
+        cls.authorized_client.force_authenticate(cls.user)
+
+        cls.authors = [
+            User.objects.create_user(username=f"author_{index}")
+            for index in range(3)
+        ]
+        cls.tags = [
+            Tag.objects.create(
+                name=f"test тег {index}",
+                color=f"#00000{index}",
+                slug=f"tag_{index}",
+            )
+            for index in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f"test ингредиент {index}",
+                measurement_unit="г",
+            )
+            for index in range(3)
+        ]
+        cls.ingredients = ingredients
+        uploaded = SimpleUploadedFile(
+            name="small.gif",
+            content=(
+                b"\x47\x49\x46\x38\x39\x61\x02\x00"
+                b"\x01\x00\x80\x00\x00\x00\x00\x00"
+                b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+                b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+                b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+                b"\x0A\x00\x3B"
+            ),
+            content_type="image/gif",
+        )
+        for index in range(RECIPES_COUNT):
+            recipe = Recipe.objects.create(
+                author=cls.authors[index % len(cls.authors)],
+                name=f"тестовый рецепт {index}",
+                image=uploaded if index == 0 else None,
+                text="описание тестового рецепта",
+                cooking_time=4,
+            )
+            recipe.tags.add(*cls.tags[: index % 3 + 1])
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(
+                    recipe=recipe, ingredient=ingredient, amount=amount + 1
+                )
+                for amount, ingredient in enumerate(
+                    ingredients[: index % 3 + 1]
+                )
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def _get_recipes_list(self, client, limit, queries):
+        with self.assertNumQueries(queries):
+            response = client.get(f"/api/recipes/?limit={limit}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), limit)
+        return response
+
+    def test_recipes_list_queries_guest_client(self):
+        """Число запросов списка рецептов не зависит от размера страницы."""
+        # count, recipes with authors, tags, ingredients
+        for limit in (6, RECIPES_COUNT):
+            with self.subTest(limit=limit):
+                self._get_recipes_list(self.guest_client, limit, 4)
+
+    def test_recipes_list_queries_authorized_client(self):
+        """Подписки на авторов загружаются одним запросом на страницу."""
+        Subscription.objects.create(user=self.user, author=self.authors[0])
+        # count, recipes with authors and flags, tags, ingredients,
+        # subscriptions
+        for limit in (6, RECIPES_COUNT):
+            with self.subTest(limit=limit):
+                response = self._get_recipes_list(
+                    self.authorized_client, limit, 5
+                )
+                for recipe in response.json()["results"]:
+                    self.assertEqual(
+                        recipe["author"]["is_subscribed"],
+                        recipe["author"]["id"] == self.authors[0].id,
+                    )
+
+    def test_recipes_list_omit_fields(self):
+        """Исключенные поля не сериализуются и не загружаются."""
+        # count, recipes with authors, tags
+        with self.assertNumQueries(3) as context:
+            response = self.guest_client.get(
+                "/api/recipes/?limit=10&omit=ingredients,text"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        recipe = response.json()["results"][0]
+        self.assertNotIn("ingredients", recipe)
+        self.assertNotIn("text", recipe)
+        self.assertIn("tags", recipe)
+        self.assertNotIn(
+            '"recipes_recipe"."text"', context.captured_queries[2]["sql"]
+        )
+
+    def test_recipes_list_selected_fields(self):
+        """Параметр fields оставляет только перечисленные поля."""
+        # count, recipes
+        with self.assertNumQueries(2):
+            response = self.authorized_client.get(
+                "/api/recipes/?limit=10&fields=name,is_favorited"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(response.json()["results"][0]),
+            ["id", "is_favorited", "name"],
+        )
+
+    def test_recipe_detail_selected_fields(self):
+        """Параметры fields и omit применяются к рецепту."""
+        recipe = Recipe.objects.get(name="тестовый рецепт 2")
+        response = self.guest_client.get(
+            f"/api/recipes/{recipe.id}/?fields=name,text,tags&omit=tags"
+        )
+        self.assertEqual(
+            response.json(),
+            {
+                "id": recipe.id,
+                "name": recipe.name,
+                "text": recipe.text,
+            },
+        )
+
+    def test_recipe_detail_queries_guest_client(self):
+        """Рецепт отдается из документа одним запросом."""
+        recipe = Recipe.objects.get(name="тестовый рецепт 2")
+        url = f"/api/recipes/{recipe.id}/"
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(1):
+            cached_response = self.guest_client.get(url)
+        self.assertEqual(cached_response.json(), response.json())
+        self.assertEqual(len(response.json()["ingredients"]), 3)
+
+    def test_recipe_detail_queries_authorized_client(self):
+        """Флаги пользователя накладываются на документ в том же запросе."""
+        recipe = Recipe.objects.get(name="тестовый рецепт 2")
+        Favorite.objects.create(user=self.user, recipe=recipe)
+        Subscription.objects.create(user=self.user, author=recipe.author)
+        url = f"/api/recipes/{recipe.id}/"
+        self.authorized_client.get(url)
+        with self.assertNumQueries(1):
+            response = self.authorized_client.get(url)
+        data = response.json()
+        self.assertTrue(data["is_favorited"])
+        self.assertFalse(data["is_in_shopping_cart"])
+        self.assertTrue(data["author"]["is_subscribed"])
+
+    def test_recipe_detail_missing_document(self):
+        """Документ строится при первом чтении, неверный id дает 404."""
+        recipe = Recipe.objects.get(name="тестовый рецепт 2")
+        RecipeDocument.objects.filter(recipe=recipe).delete()
+        response = self.guest_client.get(f"/api/recipes/{recipe.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(RecipeDocument.objects.filter(recipe=recipe).exists())
+        for recipe_id in ("abc", 10 ** 6):
+            with self.subTest(recipe_id=recipe_id):
+                response = self.guest_client.get(f"/api/recipes/{recipe_id}/")
+                self.assertEqual(
+                    response.status_code, status.HTTP_404_NOT_FOUND
+                )
+
+    def test_recipe_detail_document_rebuilt_on_tag_change(self):
+        """Документ рецепта обновляется при изменении тега."""
+        recipe = Recipe.objects.get(name="тестовый рецепт 2")
+        url = f"/api/recipes/{recipe.id}/"
+        self.guest_client.get(url)
+        tag = self.tags[0]
+        tag.name = "обновленный тег"
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.save()
+        response = self.guest_client.get(url)
+        self.assertEqual(response.json()["tags"][0]["name"], tag.name)
+
+    def test_recipes_list_tags_filter(self):
+        """Фильтр по тегам не дублирует рецепты и поддерживает any/all."""
+        url = (
+            f"/api/recipes/?limit={RECIPES_COUNT}"
+            "&tags=tag_1&tags=tag_2&tags=unknown"
+        )
+        cases = (
+            ("", 66),
+            ("&tags_match=any", 66),
+            ("&tags_match=all", 0),
+        )
+        for params, count in cases:
+            with self.subTest(params=params):
+                # tag map, count, recipes with authors, tags, ingredients
+                with self.assertNumQueries(5 if count else 1):
+                    response = self.guest_client.get(url + params)
+                data = response.json()
+                recipes_id = [recipe["id"] for recipe in data["results"]]
+                self.assertEqual(data["count"], count)
+                self.assertEqual(len(recipes_id), len(set(recipes_id)))
+                self.assertEqual(len(recipes_id), count)
+
+    def test_recipes_list_tags_filter_all(self):
+        """Режим all оставляет рецепты со всеми выбранными тегами."""
+        response = self.guest_client.get(
+            f"/api/recipes/?limit={RECIPES_COUNT}"
+            "&tags=tag_1&tags=tag_2&tags_match=all"
+        )
+        results = response.json()["results"]
+        self.assertEqual(len(results), 33)
+        for recipe in results:
+            slugs = {tag["slug"] for tag in recipe["tags"]}
+            self.assertTrue({"tag_1", "tag_2"} <= slugs)
+
+    def test_recipes_list_tags_match_invalid(self):
+        """Неизвестный режим сопоставления тегов даёт 400."""
+        response = self.guest_client.get("/api/recipes/?tags_match=some")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recipes_batch_by_ids(self):
+        """Рецепты по списку id отдаются одним запросом в порядке id."""
+        recipes_id = list(
+            Recipe.objects.order_by("?").values_list("id", flat=True)[:10]
+        )
+        query = ",".join(map(str, recipes_id + recipes_id[:2] + [0]))
+        # count, recipes with authors, tags, ingredients
+        with self.assertNumQueries(4):
+            response = self.guest_client.get(f"/api/recipes/?ids={query}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["count"], len(recipes_id))
+        self.assertEqual(
+            [recipe["id"] for recipe in data["results"]], recipes_id
+        )
+
+    def test_recipes_batch_by_ids_errors(self):
+        """Слишком длинный или некорректный список id даёт 400."""
+        query = ",".join(str(index) for index in range(1, 102))
+        response = self.guest_client.get(f"/api/recipes/?ids={query}")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ids", response.json())
+        response = self.guest_client.get("/api/recipes/?ids=1,a")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _count_ingredient_writes(self, context):
+        table = IngredientAmount._meta.db_table
+        return {
+            statement: sum(
+                query["sql"].startswith(f'{statement} "{table}"')
+                or query["sql"].startswith(f'{statement} FROM "{table}"')
+                for query in context.captured_queries
+            )
+            for statement in ("INSERT INTO", "DELETE")
+        }
+
+    def test_recipe_ingredients_bulk_created(self):
+        """Ингредиенты рецепта пишутся одним INSERT и не общие."""
+        data = {
+            "ingredients": [
+                {"id": ingredient.id, "amount": 7}
+                for ingredient in self.ingredients
+            ],
+            "tags": [self.tags[0].id],
+            "image": (
+                "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMA"
+                + "AABieywaAAAACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAO"
+                + "xAGVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJRU5ErkJggg=="
+            ),
+            "name": "рецепт с ингредиентами",
+            "text": "описание",
+            "cooking_time": 5,
+        }
+        other_rows = list(
+            IngredientAmount.objects.exclude(recipe__name=data["name"])
+            .order_by("id")
+            .values_list("id", "recipe_id", "amount")
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized_client.post(
+                "/api/recipes/", data, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            self._count_ingredient_writes(context),
+            {"INSERT INTO": 1, "DELETE": 0},
+        )
+        recipe_id = response.json()["id"]
+
+        data["ingredients"] = data["ingredients"][:2]
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized_client.patch(
+                f"/api/recipes/{recipe_id}/", data, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self._count_ingredient_writes(context),
+            {"INSERT INTO": 1, "DELETE": 1},
+        )
+        self.assertEqual(
+            IngredientAmount.objects.filter(recipe_id=recipe_id).count(), 2
+        )
+        self.assertEqual(
+            list(
+                IngredientAmount.objects.exclude(recipe_id=recipe_id)
+                .order_by("id")
+                .values_list("id", "recipe_id", "amount")
+            ),
+            other_rows,
+        )
+
+    def test_recipe_update_queries(self):
+        """Рецепт с 30 ингредиентами обновляется за одну валидацию."""
+        recipe = Recipe.objects.filter(image__gt="").first()
+        image = recipe.image.name
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"ингредиент {index}", measurement_unit="г")
+            for index in range(UPDATE_INGREDIENTS_COUNT)
+        )
+        data = {
+            "ingredients": [
+                {"id": ingredient.id, "amount": 3}
+                for ingredient in ingredients
+            ],
+            "tags": [tag.id for tag in self.tags],
+            "name": "обновленный рецепт",
+            "text": "обновленное описание",
+            "cooking_time": 12,
+        }
+        url = f"/api/recipes/{recipe.id}/"
+        self.authorized_client.force_authenticate(recipe.author)
+        # the search backend is picked once per process
+        get_search_backend()
+        # recipe, its author, one IN query for ingredients and for tags,
+        # ingredient rows delete and insert, recipe update, tags diff,
+        # document rebuild, search index and the rendered document
+        with self.assertNumQueries(22):
+            response = self.authorized_client.patch(url, data, format="json")
+        self.authorized_client.force_authenticate(self.user)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, image)
+        self.assertEqual(
+            len(response.json()["ingredients"]), UPDATE_INGREDIENTS_COUNT
+        )
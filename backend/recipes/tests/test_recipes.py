@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 import unittest
@@ -52,14 +53,6 @@ class RecipeTest(TestCase):
             color="#6AA84FFF",
             slug="dinner",
         )
-        cls.ingredientamount_orange = IngredientAmount.objects.create(
-            ingredient=cls.ingredient_orange,
-            amount=5,
-        )
-        cls.ingredientamount_jam = IngredientAmount.objects.create(
-            ingredient=cls.ingredient_jam,
-            amount=1,
-        )
         cls.small_gif = (
             b"\x47\x49\x46\x38\x39\x61\x02\x00"
             b"\x01\x00\x80\x00\x00\x00\x00\x00"
@@ -81,9 +74,11 @@ class RecipeTest(TestCase):
             cooking_time=4,
         )
         cls.recipe_breakfast.tags.add(cls.tag_breakfast)
-        cls.recipe_breakfast.ingredients.add(
-            cls.ingredientamount_orange,
-            cls.ingredientamount_jam,
+        cls.recipe_breakfast.ingredients.create(
+            ingredient=cls.ingredient_orange, amount=5
+        )
+        cls.recipe_breakfast.ingredients.create(
+            ingredient=cls.ingredient_jam, amount=1
         )
 
         cls.small_gif_test = (
@@ -107,7 +102,15 @@ class RecipeTest(TestCase):
             cooking_time=4,
         )
         cls.recipe.tags.add(cls.tag_breakfast)
-        cls.recipe.ingredients.add(cls.ingredientamount_orange)
+        cls.recipe.ingredients.create(
+            ingredient=cls.ingredient_orange, amount=5
+        )
+        # Одинаковые картинки обоих рецептов хранятся одним файлом.
+        cls.image_url = (
+            "http://testserver/media/recipes/images/"
+            + hashlib.sha256(cls.small_gif).hexdigest()
+            + ".gif"
+        )
 
     @classmethod
     def tearDownClass(cls):
@@ -154,7 +157,7 @@ class RecipeTest(TestCase):
                     },
                     "ingredients": [
                         {
-                            "id": 1,
+                            "id": 3,
                             "name": "test апельсин",
                             "measurement_unit": "шт.",
                             "amount": 5,
@@ -163,9 +166,8 @@ class RecipeTest(TestCase):
                     "is_favorited": False,
                     "is_in_shopping_cart": False,
                     "name": "тестовый рецепт",
-                    "image": (
-                        "http://testserver/media/recipes/images/small_1.gif"
-                    ),
+                    "image": self.image_url,
+                    "image_variants": None,
                     "text": "описание тестового рецепта",
                     "cooking_time": 4,
                 },
@@ -204,9 +206,8 @@ class RecipeTest(TestCase):
                     "is_favorited": False,
                     "is_in_shopping_cart": False,
                     "name": "test рецепт",
-                    "image": (
-                        "http://testserver/media/recipes/images/small.gif"
-                    ),
+                    "image": self.image_url,
+                    "image_variants": None,
                     "text": "описание тестового рецепта",
                     "cooking_time": 4,
                 },
@@ -254,7 +255,8 @@ class RecipeTest(TestCase):
             "is_favorited": False,
             "is_in_shopping_cart": False,
             "name": "test рецепт",
-            "image": "http://testserver/media/recipes/images/small.gif",
+            "image": self.image_url,
+            "image_variants": None,
             "text": "описание тестового рецепта",
             "cooking_time": 4,
         }
@@ -300,7 +302,8 @@ class RecipeTest(TestCase):
             "is_favorited": False,
             "is_in_shopping_cart": False,
             "name": "test рецепт",
-            "image": "http://testserver/media/recipes/images/small.gif",
+            "image": self.image_url,
+            "image_variants": None,
             "text": "описание тестового рецепта",
             "cooking_time": 4,
         }
@@ -382,13 +385,13 @@ class RecipeTest(TestCase):
             },
             "ingredients": [
                 {
-                    "id": 3,
+                    "id": 4,
                     "name": "test апельсин",
                     "measurement_unit": "шт.",
                     "amount": 10,
                 },
                 {
-                    "id": 4,
+                    "id": 5,
                     "name": "test варенье",
                     "measurement_unit": "ложка",
                     "amount": 30,
@@ -398,6 +401,7 @@ class RecipeTest(TestCase):
             "is_in_shopping_cart": False,
             "name": "Тестовый рецепт обеда",
             "image": image,
+            "image_variants": None,
             "text": "Описание тестового рецепта обеда",
             "cooking_time": 30,
         }
@@ -593,6 +597,74 @@ class RecipeTest(TestCase):
         }
         self.assertEqual(response.json(), test_json)
 
+    def _get_recipe_data(self, ingredients, tags):
+        return {
+            "ingredients": ingredients,
+            "tags": tags,
+            "image": (
+                "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMA"
+                + "AABieywaAAAACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAO"
+                + "xAGVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJRU5ErkJggg=="
+            ),
+            "name": "Тестовый рецепт обеда",
+            "text": "Описание тестового рецепта обеда",
+            "cooking_time": 5,
+        }
+
+    def test_create_recipe_duplicate_ingredients_and_tags(self):
+        """Повторы ингредиентов и тегов находятся не только подряд."""
+        data = self._get_recipe_data(
+            [
+                {"id": self.ingredient_orange.id, "amount": 10},
+                {"id": self.ingredient_jam.id, "amount": 30},
+                {"id": self.ingredient_orange.id, "amount": 5},
+            ],
+            [self.tag_breakfast.id, self.tag_dinner.id, self.tag_breakfast.id],
+        )
+        response = self.authorized_client.post(
+            "/api/recipes/", data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        test_json = {
+            "non_field_errors": [
+                "Вы добавили одинаковые теги",
+                "Вы добавили одинаковые ингредиенты",
+            ]
+        }
+        self.assertEqual(response.json(), test_json)
+
+    def test_create_recipe_unknown_ingredient_and_tag(self):
+        """Несуществующие id ингредиента и тега дают ошибки полей."""
+        data = self._get_recipe_data(
+            [
+                {"id": self.ingredient_orange.id, "amount": 10},
+                {"id": 999, "amount": 30},
+                {"id": "abc", "amount": 30},
+            ],
+            [self.tag_breakfast.id, 999],
+        )
+        response = self.authorized_client.post(
+            "/api/recipes/", data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        does_not_exist = (
+            'Недопустимый первичный ключ "999" - объект не существует.'
+        )
+        test_json = {
+            "ingredients": [
+                {},
+                {"id": [does_not_exist]},
+                {
+                    "id": [
+                        "Некорректный тип. Ожидалось значение первичного "
+                        "ключа, получен str."
+                    ]
+                },
+            ],
+            "tags": [does_not_exist],
+        }
+        self.assertEqual(response.json(), test_json)
+
     def test_patch_recipe_authorized_client(self):
         """Обновление рецепта авторизованным пользователем."""
         recipe = Recipe.objects.create(
@@ -603,7 +675,7 @@ class RecipeTest(TestCase):
             cooking_time=4,
         )
         recipe.tags.add(self.tag_breakfast)
-        recipe.ingredients.add(self.ingredientamount_orange)
+        recipe.ingredients.create(ingredient=self.ingredient_orange, amount=5)
         data = {
             "ingredients": [
                 {"id": self.ingredient_orange.id, "amount": 10},
@@ -651,13 +723,13 @@ class RecipeTest(TestCase):
             },
             "ingredients": [
                 {
-                    "id": 3,
+                    "id": 5,
                     "name": "test апельсин",
                     "measurement_unit": "шт.",
                     "amount": 10,
                 },
                 {
-                    "id": 4,
+                    "id": 6,
                     "name": "test варенье",
                     "measurement_unit": "ложка",
                     "amount": 30,
@@ -667,6 +739,7 @@ class RecipeTest(TestCase):
             "is_in_shopping_cart": False,
             "name": "обновленный тестовый рецепт",
             "image": image,
+            "image_variants": None,
             "text": "обновленное описание тестового рецепта",
             "cooking_time": 21,
         }
@@ -726,13 +799,13 @@ class RecipeTest(TestCase):
             },
             "ingredients": [
                 {
-                    "id": 3,
+                    "id": 4,
                     "name": "test апельсин",
                     "measurement_unit": "шт.",
                     "amount": 10,
                 },
                 {
-                    "id": 4,
+                    "id": 5,
                     "name": "test варенье",
                     "measurement_unit": "ложка",
                     "amount": 30,
@@ -742,6 +815,7 @@ class RecipeTest(TestCase):
             "is_in_shopping_cart": False,
             "name": "обновленный тестовый рецепт",
             "image": image,
+            "image_variants": None,
             "text": "обновленное описание тестового рецепта",
             "cooking_time": 21,
         }
@@ -854,13 +928,13 @@ class RecipeTest(TestCase):
             },
             "ingredients": [
                 {
-                    "id": 3,
+                    "id": 4,
                     "name": "test апельсин",
                     "measurement_unit": "шт.",
                     "amount": 10,
                 },
                 {
-                    "id": 4,
+                    "id": 5,
                     "name": "test варенье",
                     "measurement_unit": "ложка",
                     "amount": 30,
@@ -870,6 +944,7 @@ class RecipeTest(TestCase):
             "is_in_shopping_cart": False,
             "name": "обновленный тестовый рецепт",
             "image": image,
+            "image_variants": None,
             "text": "обновленное описание тестового рецепта",
             "cooking_time": 21,
         }
@@ -1036,7 +1111,7 @@ class RecipeTest(TestCase):
             },
             "ingredients": [
                 {
-                    "id": 1,
+                    "id": 3,
                     "name": "test апельсин",
                     "measurement_unit": "шт.",
                     "amount": 5,
@@ -1045,7 +1120,8 @@ class RecipeTest(TestCase):
             "is_favorited": True,
             "is_in_shopping_cart": False,
             "name": "тестовый рецепт",
-            "image": "http://testserver/media/recipes/images/small_1.gif",
+            "image": self.image_url,
+            "image_variants": None,
             "text": "описание тестового рецепта",
             "cooking_time": 4,
         }
@@ -1078,7 +1154,7 @@ class RecipeTest(TestCase):
             },
             "ingredients": [
                 {
-                    "id": 1,
+                    "id": 3,
                     "name": "test апельсин",
                     "measurement_unit": "шт.",
                     "amount": 5,
@@ -1087,7 +1163,8 @@ class RecipeTest(TestCase):
             "is_favorited": False,
             "is_in_shopping_cart": False,
             "name": "тестовый рецепт",
-            "image": "http://testserver/media/recipes/images/small_1.gif",
+            "image": self.image_url,
+            "image_variants": None,
             "text": "описание тестового рецепта",
             "cooking_time": 4,
         }
@@ -1127,6 +1204,7 @@ class RecipeTest(TestCase):
                     "is_in_shopping_cart": False,
                     "name": "тестовый рецепт",
                     "image": None,
+                    "image_variants": None,
                     "text": "описание тестового рецепта",
                     "cooking_time": 4,
                 },
@@ -1150,7 +1228,7 @@ class RecipeTest(TestCase):
                     },
                     "ingredients": [
                         {
-                            "id": 1,
+                            "id": 3,
                             "name": "test апельсин",
                             "measurement_unit": "шт.",
                             "amount": 5,
@@ -1159,9 +1237,8 @@ class RecipeTest(TestCase):
                     "is_favorited": True,
                     "is_in_shopping_cart": False,
                     "name": "тестовый рецепт",
-                    "image": (
-                        "http://testserver/media/recipes/images/small_1.gif"
-                    ),
+                    "image": self.image_url,
+                    "image_variants": None,
                     "text": "описание тестового рецепта",
                     "cooking_time": 4,
                 },
@@ -1200,9 +1277,8 @@ class RecipeTest(TestCase):
                     "is_favorited": False,
                     "is_in_shopping_cart": False,
                     "name": "test рецепт",
-                    "image": (
-                        "http://testserver/media/recipes/images/small.gif"
-                    ),
+                    "image": self.image_url,
+                    "image_variants": None,
                     "text": "описание тестового рецепта",
                     "cooking_time": 4,
                 },
@@ -1220,7 +1296,8 @@ class RecipeTest(TestCase):
         test_json = {
             "id": 1,
             "name": "test рецепт",
-            "image": "http://testserver/media/recipes/images/small.gif",
+            "image": self.image_url,
+            "image_variants": None,
             "cooking_time": 4,
         }
         self.assertEqual(response.json(), test_json)
@@ -1320,7 +1397,8 @@ class RecipeTest(TestCase):
             "is_favorited": False,
             "is_in_shopping_cart": True,
             "name": "test рецепт",
-            "image": "http://testserver/media/recipes/images/small.gif",
+            "image": self.image_url,
+            "image_variants": None,
             "text": "описание тестового рецепта",
             "cooking_time": 4,
         }
@@ -1369,7 +1447,8 @@ class RecipeTest(TestCase):
             "is_favorited": False,
             "is_in_shopping_cart": False,
             "name": "test рецепт",
-            "image": "http://testserver/media/recipes/images/small.gif",
+            "image": self.image_url,
+            "image_variants": None,
             "text": "описание тестового рецепта",
             "cooking_time": 4,
         }
@@ -1409,6 +1488,7 @@ class RecipeTest(TestCase):
                     "is_in_shopping_cart": False,
                     "name": "тестовый рецепт",
                     "image": None,
+                    "image_variants": None,
                     "text": "описание тестового рецепта",
                     "cooking_time": 4,
                 },
@@ -1432,7 +1512,7 @@ class RecipeTest(TestCase):
                     },
                     "ingredients": [
                         {
-                            "id": 1,
+                            "id": 3,
                             "name": "test апельсин",
                             "measurement_unit": "шт.",
                             "amount": 5,
@@ -1441,9 +1521,8 @@ class RecipeTest(TestCase):
                     "is_favorited": False,
                     "is_in_shopping_cart": True,
                     "name": "тестовый рецепт",
-                    "image": (
-                        "http://testserver/media/recipes/images/small_1.gif"
-                    ),
+                    "image": self.image_url,
+                    "image_variants": None,
                     "text": "описание тестового рецепта",
                     "cooking_time": 4,
                 },
@@ -1482,9 +1561,8 @@ class RecipeTest(TestCase):
                     "is_favorited": False,
                     "is_in_shopping_cart": False,
                     "name": "test рецепт",
-                    "image": (
-                        "http://testserver/media/recipes/images/small.gif"
-                    ),
+                    "image": self.image_url,
+                    "image_variants": None,
                     "text": "описание тестового рецепта",
                     "cooking_time": 4,
                 },
@@ -1502,7 +1580,8 @@ class RecipeTest(TestCase):
         test_json = {
             "id": 1,
             "name": "test рецепт",
-            "image": "http://testserver/media/recipes/images/small.gif",
+            "image": self.image_url,
+            "image_variants": None,
             "cooking_time": 4,
         }
         self.assertEqual(response.json(), test_json)
@@ -1575,17 +1654,15 @@ class RecipeTest(TestCase):
             name="cucumber",
             measurement_unit="spoon",
         )
-        ingredientamount_jam = IngredientAmount.objects.create(
-            ingredient=ingredient_jam,
-            amount=5,
-        )
-        ingredientamount_cucumber = IngredientAmount.objects.create(
-            ingredient=ingredient_cucumber,
-            amount=3,
-        )
-        recipe.ingredients.add(
-            ingredientamount_jam,
-            ingredientamount_cucumber,
+        IngredientAmount.objects.bulk_create(
+            (
+                IngredientAmount(
+                    recipe=recipe, ingredient=ingredient_jam, amount=5
+                ),
+                IngredientAmount(
+                    recipe=recipe, ingredient=ingredient_cucumber, amount=3
+                ),
+            )
         )
         ShoppingCart.objects.create(
             user=self.user,
@@ -1602,17 +1679,15 @@ class RecipeTest(TestCase):
             name="ketchup",
             measurement_unit="spoon",
         )
-        ingredientamount_ketchup = IngredientAmount.objects.create(
-            ingredient=ingredient_ketchup,
-            amount=2,
-        )
-        ingredientamount_jam_10 = IngredientAmount.objects.create(
-            ingredient=ingredient_jam,
-            amount=10,
-        )
-        recipe.ingredients.add(
-            ingredientamount_ketchup,
-            ingredientamount_jam_10,
+        IngredientAmount.objects.bulk_create(
+            (
+                IngredientAmount(
+                    recipe=recipe, ingredient=ingredient_ketchup, amount=2
+                ),
+                IngredientAmount(
+                    recipe=recipe, ingredient=ingredient_jam, amount=10
+                ),
+            )
         )
         ShoppingCart.objects.create(
             user=self.user,
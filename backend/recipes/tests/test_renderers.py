@@ -0,0 +1,103 @@
+import datetime
+import json
+from decimal import Decimal
+
+import msgpack
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+from foodgram.renderers import MessagePackRenderer, ORJSONRenderer
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from ..models import Ingredient, Recipe, Tag
+
+
+class RenderersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest_client = APIClient()
+
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.authorized_client = APIClient()
+        cls.authorized_client.force_authenticate(cls.user)
+
+        cls.tag_breakfast = Tag.objects.create(
+            name="test Завтрак",
+            color="#6AA84F",
+            slug="breakfast",
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name="test апельсин",
+            measurement_unit="шт.",
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user,
+            name="тестовый рецепт",
+            image=None,
+            text="описание тестового рецепта",
+            cooking_time=4,
+        )
+        cls.recipe.tags.add(cls.tag_breakfast)
+        cls.recipe.ingredients.create(ingredient=cls.ingredient, amount=2)
+
+    def test_json_is_default(self):
+        """JSON остаётся форматом по умолчанию и совпадает с JSONRenderer."""
+        response = self.guest_client.get("/api/recipes/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(
+            response.content, JSONRenderer().render(response.data)
+        )
+
+    def test_msgpack_by_accept_header(self):
+        """Список рецептов отдаётся в MessagePack по заголовку Accept."""
+        response = self.guest_client.get(
+            "/api/recipes/", HTTP_ACCEPT="application/msgpack"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        data = msgpack.unpackb(response.content)
+        self.assertEqual(data["count"], 1)
+        self.assertEqual(data["results"][0]["name"], self.recipe.name)
+
+    def test_msgpack_request_body(self):
+        """Тело запроса в MessagePack разбирается как JSON."""
+        response = self.authorized_client.post(
+            "/api/recipes/",
+            msgpack.packb({"name": "рецепт", "cooking_time": 0}),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        errors = msgpack.unpackb(response.content)
+        self.assertIn("cooking_time", errors)
+        self.assertNotIn("name", errors)
+
+    def test_invalid_msgpack_body(self):
+        """Битое тело в MessagePack даёт 400."""
+        response = self.authorized_client.post(
+            "/api/recipes/",
+            b"\xc1",
+            content_type="application/msgpack",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fallback_types(self):
+        """Ленивые строки, Decimal и datetime кодируются как в DRF."""
+        data = {
+            "lazy": gettext_lazy("Рецепт"),
+            "decimal": Decimal("1.50"),
+            "datetime": datetime.datetime(2022, 8, 1, 12, 30, 15, 123456),
+            "date": datetime.date(2022, 8, 1),
+        }
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+        self.assertEqual(
+            msgpack.unpackb(MessagePackRenderer().render(data)),
+            json.loads(JSONRenderer().render(data)),
+        )
@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from ..models import Ingredient, Recipe, Tag
+from ..search import InProcessSearchBackend, search_recipes
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+IMAGE = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMA"
+    "AABieywaAAAACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAO"
+    "xAGVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJRU5ErkJggg=="
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RecipeSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest_client = APIClient()
+
+        cls.user = User.objects.create_user(username="authorized_user")
+        cls.authorized_client = APIClient()
+        cls.authorized_client.force_authenticate(cls.user)
+
+        cls.tag = Tag.objects.create(
+            name="test Обед",
+            color="#6AA84F",
+            slug="dinner",
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name="test свекла",
+            measurement_unit="шт.",
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def _get_data(self, name, text):
+        return {
+            "ingredients": [{"id": self.ingredient.id, "amount": 1}],
+            "tags": [self.tag.id],
+            "image": IMAGE,
+            "name": name,
+            "text": text,
+            "cooking_time": 30,
+        }
+
+    def _create_recipe(self, name, text):
+        response = self.authorized_client.post(
+            "/api/recipes/", self._get_data(name, text), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()["id"]
+
+    def _search(self, query):
+        response = self.guest_client.get(
+            "/api/recipes/", {"search": query, "count": "0"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe["id"] for recipe in response.json()["results"]]
+
+    def test_search_ranked(self):
+        """Совпадение в названии ранжируется выше совпадения в описании."""
+        salad = self._create_recipe("Салат", "к борщу подают салат")
+        borsch = self._create_recipe("Борщ", "свекла, капуста и мясо")
+        self._create_recipe("Омлет", "яйца и молоко")
+        self.assertEqual(self._search("борщ"), [borsch, salad])
+        self.assertEqual(self._search("Капуста свекла"), [borsch])
+        self.assertEqual(self._search("пицца"), [])
+
+    def test_search_index_follows_updates(self):
+        """Индекс обновляется при изменении и удалении рецепта."""
+        recipe_id = self._create_recipe("Омлет", "яйца и молоко")
+        response = self.authorized_client.patch(
+            f"/api/recipes/{recipe_id}/",
+            self._get_data("Сырники", "творог и мука"),
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._search("омлет"), [])
+        self.assertEqual(self._search("творог"), [recipe_id])
+        Recipe.objects.filter(id=recipe_id).delete()
+        self.assertEqual(self._search("творог"), [])
+
+    def test_empty_search(self):
+        """Запрос без слов не фильтрует рецепты."""
+        self._create_recipe("Омлет", "яйца и молоко")
+        self.assertEqual(len(self._search(" , ")), 1)
+
+    def test_in_process_backend(self):
+        """Запасной индекс в памяти ищет и ранжирует так же."""
+        salad = self._create_recipe("Салат", "к борщу подают салат")
+        borsch = self._create_recipe("Борщ", "свекла, капуста и борщ")
+        backend = InProcessSearchBackend()
+        queryset = backend.search(Recipe.objects.all(), "Борщ")
+        self.assertEqual(
+            list(
+                queryset.order_by("-search_rank").values_list("id", flat=True)
+            ),
+            [borsch],
+        )
+        recipe = Recipe.objects.get(id=salad)
+        recipe.text = "борщ и салат"
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+            backend.update(recipe)
+        queryset = backend.search(Recipe.objects.all(), "борщ салат")
+        self.assertEqual(list(queryset.values_list("id", flat=True)), [salad])
+
+    def test_search_recipes_without_terms(self):
+        """Пустой запрос возвращает исходный queryset."""
+        queryset = Recipe.objects.all()
+        self.assertIs(search_recipes(queryset, ""), queryset)
@@ -1,33 +1,75 @@
-import copy
+import hashlib
 
-from django.db.models import F, Sum
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Sum, Value
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
 
+from .caching import (RECIPE_LIST_CACHE_TIMEOUT, get_payload_digest,
+                      get_recipe_flags, get_recipe_list_cache_key,
+                      get_recipe_memberships, is_recipe_list_cacheable,
+                      overlay_recipe_flags, strip_recipe_flags)
+from .conditional import (conditional_response, get_catalog_version,
+                          make_etag)
+from .documents import (get_recipe_documents, get_recipe_fields,
+                        prefetch_recipe_relations, render_recipe_document,
+                        update_recipe_document)
+from .fast_serializers import (SIDELOAD_QUERY_PARAM, get_recipe_rows,
+                               serialize_recipe_rows,
+                               serialize_sideloaded_recipe_rows)
 from .filters import IngredientSearchFilter, RecipeFilter
 from .models import (Favorite, Ingredient, IngredientAmount, Recipe,
                      ShoppingCart, Tag)
-from .pagination import RecipePagination
+from .pagination import RecipeCursorPagination, RecipePagination
 from .permissions import IsAuthorOrAdminOrIsAuthenticatedOrReadOnly
-from .serializers import (IngredientSerializer, RecipeReadSerializer,
-                          RecipeWriteSerializer, ShortRecipeSerializer,
-                          TagSerializer)
+from .serializers import (IngredientSerializer, RecipeIdsSerializer,
+                          RecipeReadSerializer, RecipeWriteSerializer,
+                          ShortRecipeSerializer, TagSerializer)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class CatalogConditionalGetMixin:
+    catalog_name = None
+
+    def _conditional_response(self, handler, request, *args, **kwargs):
+        catalog = get_catalog_version(self.catalog_name)
+        return conditional_response(
+            request,
+            lambda: handler(request, *args, **kwargs),
+            etag=make_etag(self.catalog_name, catalog.version),
+            last_modified=catalog.updated_at,
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class TagViewSet(CatalogConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    catalog_name = "tags"
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    CatalogConditionalGetMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientSearchFilter
+    catalog_name = "ingredients"
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -37,11 +79,114 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        user = self.request.user
+        fields = get_recipe_fields(self.request)
+        queryset = super().get_queryset()
+        if self.request.method in SAFE_METHODS:
+            queryset = prefetch_recipe_relations(queryset, fields)
+        if "text" not in fields:
+            queryset = queryset.defer("text")
+        if not {"is_favorited", "is_in_shopping_cart"} & fields:
+            return queryset
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+        )
+
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def list(self, request, *args, **kwargs):
+        if not is_recipe_list_cacheable(request):
+            response = self._render_content(self._render_list(request))
+            etag = make_etag(hashlib.md5(response.content).hexdigest())
+            return conditional_response(request, lambda: response, etag=etag)
+        cache_key = get_recipe_list_cache_key(request)
+        cached = cache.get(cache_key)
+        if cached is None:
+            response = self._render_list(request)
+            data = strip_recipe_flags(response.data)
+            digest = get_payload_digest(data)
+            cache.set(cache_key, (digest, data), RECIPE_LIST_CACHE_TIMEOUT)
+        else:
+            digest, data = cached
+            response = Response(overlay_recipe_flags(data, request.user))
+        # A cached page answers 304 without being serialized again.
+        etag = make_etag(digest, *get_recipe_memberships(response.data))
+        return conditional_response(request, lambda: response, etag=etag)
+
+    def _render_content(self, response):
+        # Rendered once to hash the bytes: DRF skips rendered responses.
+        response.accepted_renderer = self.request.accepted_renderer
+        response.accepted_media_type = self.request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.content = response.rendered_content
+        return response
+
+    def _render_list(self, request):
+        fields = get_recipe_fields(request)
+        rows = get_recipe_rows(
+            self.filter_queryset(self.get_queryset()), fields
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            rows = page
+        included = None
+        if request.query_params.get(SIDELOAD_QUERY_PARAM) == "1":
+            data, included = serialize_sideloaded_recipe_rows(
+                rows, request, fields
+            )
+        else:
+            data = serialize_recipe_rows(rows, request, fields)
+        if page is None:
+            if included is None:
+                return Response(data)
+            return Response({"results": data, "included": included})
+        response = self.get_paginated_response(data)
+        if included is not None:
+            response.data["included"] = included
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            pk = int(kwargs["pk"])
+        except (TypeError, ValueError):
+            raise Http404
+        documents = get_recipe_documents(request.user)
+        document = documents.filter(recipe_id=pk).first()
+        if document is None:
+            # update_or_create lets concurrent first reads build it twice.
+            update_recipe_document(get_object_or_404(Recipe, pk=pk))
+            document = documents.get(recipe_id=pk)
+        etag = make_etag(
+            document.recipe_id,
+            document.updated_at.isoformat(),
+            document.is_favorited,
+            document.is_in_shopping_cart,
+            document.is_subscribed,
+        )
+        last_modified = None
+        if not request.user.is_authenticated:
+            last_modified = document.updated_at
+        return conditional_response(
+            request,
+            lambda: Response(render_recipe_document(document, request)),
+            etag=etag,
+            last_modified=last_modified,
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -62,34 +207,27 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user)
 
     def update(self, request, *args, **kwargs):
-        partial = kwargs.pop("partial", False)
-        instance = self.get_object()
-
-        data = request.data
-        data = copy.deepcopy(request.data)
-        if not request.data.get("image"):
-            test_base64code = (
-                "R0lGODlhAgABAIAAAAAAAP///yH5BAAAAAAALAAAAAACAAEAAAICDAoAOw=="
-            )
-            data["image"] = test_base64code
-        serializer = self.get_serializer(data=data)
-        serializer.is_valid(raise_exception=True)
-
+        # PATCH keeps the PUT contract: every field but image is required.
+        kwargs.pop("partial", False)
         serializer = self.get_serializer(
-            instance=instance,
-            data=request.data,
-            partial=partial,
+            instance=self.get_object(), data=request.data
         )
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
-        instance = serializer.instance
-        serializer = RecipeReadSerializer(
-            instance=instance,
-            context={"request": request},
+        document = get_recipe_documents(request.user).get(
+            recipe_id=serializer.instance.pk
         )
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(render_recipe_document(document, request))
+
+    def _update_counter(self, recipe, counter_field, delta):
+        if counter_field is None:
+            return
+        recipes = Recipe.objects.filter(pk=recipe.pk)
+        if delta < 0:
+            recipes = recipes.filter(**{f"{counter_field}__gte": -delta})
+        recipes.update(**{counter_field: F(counter_field) + delta})
 
-    def _do_post_method(self, request, model, error_data):
+    def _do_post_method(self, request, model, error_data, counter_field=None):
         user = request.user
         recipe = self.get_object()
         if model.objects.filter(
@@ -97,17 +235,20 @@ class RecipeViewSet(viewsets.ModelViewSet):
             recipe=recipe,
         ).exists():
             return Response(error_data, status=status.HTTP_400_BAD_REQUEST)
-        model.objects.create(
-            user=user,
-            recipe=recipe,
-        )
+        with transaction.atomic():
+            model.objects.create(
+                user=user,
+                recipe=recipe,
+            )
+            self._update_counter(recipe, counter_field, 1)
         serializer = ShortRecipeSerializer(
             recipe,
             context={"request": request},
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def _do_delete_method(self, request, model, error_data):
+    def _do_delete_method(self, request, model, error_data,
+                          counter_field=None):
         user = request.user
         recipe = self.get_object()
         favorite = model.objects.filter(
@@ -115,10 +256,47 @@ class RecipeViewSet(viewsets.ModelViewSet):
             recipe=recipe,
         )
         if favorite.exists():
-            favorite.delete()
+            with transaction.atomic():
+                deleted, _ = favorite.delete()
+                self._update_counter(recipe, counter_field, -deleted)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(error_data, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+    )
+    def feed(self, request):
+        fields = get_recipe_fields(request)
+        rows = get_recipe_rows(
+            self.get_queryset().filter(feed_entries__user=request.user),
+            fields,
+        )
+        paginator = RecipeCursorPagination()
+        page = paginator.paginate_queryset(rows, request, self)
+        return paginator.get_paginated_response(
+            serialize_recipe_rows(page, request, fields)
+        )
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+    )
+    def flags(self, request):
+        serializer = RecipeIdsSerializer(
+            data={
+                "ids": [
+                    value
+                    for value in request.query_params.get("ids", "").split(",")
+                    if value.strip()
+                ]
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            get_recipe_flags(request.user, serializer.validated_data["ids"])
+        )
+
     @action(
         detail=True,
         methods=["post", "delete"],
@@ -128,10 +306,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if request.method == "POST":
             model = Favorite
             error_data = {"errors": "Рецепт уже добавлен в избранное"}
-            return self._do_post_method(request, model, error_data)
+            return self._do_post_method(
+                request, model, error_data, "favorites_count"
+            )
         model = Favorite
         error_data = {"errors": "Рецепт уже удален из избранного"}
-        return self._do_delete_method(request, model, error_data)
+        return self._do_delete_method(
+            request, model, error_data, "favorites_count"
+        )
 
     @action(
         detail=True,
@@ -1,6 +1,8 @@
-from rest_framework.pagination import PageNumberPagination
+from recipes.pagination import CachedCountPagination
 
 
-class UsersPagination(PageNumberPagination):
+class UsersPagination(CachedCountPagination):
     page_size = 6
     page_size_query_param = "limit"
+    count_cache_namespace = "users_count"
+    personal_actions = ("subscriptions",)
@@ -6,7 +6,19 @@ from recipes.models import Recipe
 from .models import User
 
 
-class CustomUserSerializer(UserSerializer):
+class IsSubscribedMixin:
+    def get_is_subscribed(self, obj):
+        user = self.context["request"].user
+        if not user.is_authenticated:
+            return False
+        if "subscribed_author_ids" not in self.context:
+            self.context["subscribed_author_ids"] = set(
+                user.subscribers.values_list("author_id", flat=True)
+            )
+        return obj.id in self.context["subscribed_author_ids"]
+
+
+class CustomUserSerializer(IsSubscribedMixin, UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -20,15 +32,6 @@ class CustomUserSerializer(UserSerializer):
             "is_subscribed",
         )
 
-    def get_is_subscribed(self, obj):
-        user = self.context["request"].user
-        return (
-            user.is_authenticated
-            and user.subscribers.filter(
-                author=obj,
-            ).exists()
-        )
-
 
 class CustomUserCreateSerializer(UserCreateSerializer):
     class Meta:
@@ -64,7 +67,9 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
 
-class UserSubscriptionSerializer(serializers.ModelSerializer):
+class UserSubscriptionSerializer(
+    IsSubscribedMixin, serializers.ModelSerializer
+):
     is_subscribed = serializers.SerializerMethodField()
     recipes = RecipeSerializer(many=True)
     recipes_count = serializers.SerializerMethodField()
@@ -82,14 +87,5 @@ class UserSubscriptionSerializer(serializers.ModelSerializer):
             "recipes_count",
         )
 
-    def get_is_subscribed(self, obj):
-        user = self.context["request"].user
-        return (
-            user.is_authenticated
-            and user.subscribers.filter(
-                author=obj,
-            ).exists()
-        )
-
     def get_recipes_count(self, obj):
         return Recipe.objects.filter(author=obj).count()
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.caching import invalidate_cache
+from recipes.feed import backfill_feed, prune_feed
+from .models import Subscription, User
+
+
+@receiver(post_save, sender=User)
+def invalidate_users_count_on_create(sender, instance, created, **kwargs):
+    if created:
+        invalidate_cache("users_count")
+
+
+@receiver(post_delete, sender=User)
+def invalidate_users_count_on_delete(sender, instance, **kwargs):
+    invalidate_cache("users_count")
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscriptions_count(sender, instance, **kwargs):
+    invalidate_cache("users_count", instance.user_id)
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_feed_on_subscribe(sender, instance, created, raw=False,
+                               **kwargs):
+    if created and not raw:
+        backfill_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def prune_feed_on_unsubscribe(sender, instance, **kwargs):
+    prune_feed(instance.user_id, instance.author_id)
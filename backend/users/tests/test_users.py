@@ -2,7 +2,7 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from recipes.models import Ingredient, Recipe, Tag
 from users.models import Subscription, User
 
 
@@ -47,14 +47,6 @@ class UsersViewsTest(TestCase):
             color="#6AA84FFF",
             slug="dinner",
         )
-        cls.ingredientamount_orange = IngredientAmount.objects.create(
-            ingredient=cls.ingredient_orange,
-            amount=5,
-        )
-        cls.ingredientamount_jam = IngredientAmount.objects.create(
-            ingredient=cls.ingredient_jam,
-            amount=1,
-        )
         cls.recipe_orange_jam = Recipe.objects.create(
             author=cls.user,
             name="test рецепт",
@@ -62,9 +54,11 @@ class UsersViewsTest(TestCase):
             cooking_time=4,
         )
         cls.recipe_orange_jam.tags.add(cls.tag_breakfast)
-        cls.recipe_orange_jam.ingredients.add(
-            cls.ingredientamount_orange,
-            cls.ingredientamount_jam,
+        cls.recipe_orange_jam.ingredients.create(
+            ingredient=cls.ingredient_orange, amount=5
+        )
+        cls.recipe_orange_jam.ingredients.create(
+            ingredient=cls.ingredient_jam, amount=1
         )
         cls.recipe_breakfast = Recipe.objects.create(
             author=cls.user,
@@ -73,9 +67,11 @@ class UsersViewsTest(TestCase):
             cooking_time=10,
         )
         cls.recipe_breakfast.tags.add(cls.tag_breakfast)
-        cls.recipe_breakfast.ingredients.add(
-            cls.ingredientamount_orange,
-            cls.ingredientamount_jam,
+        cls.recipe_breakfast.ingredients.create(
+            ingredient=cls.ingredient_orange, amount=5
+        )
+        cls.recipe_breakfast.ingredients.create(
+            ingredient=cls.ingredient_jam, amount=1
         )
 
     def test_cool_test(self):
@@ -126,6 +122,26 @@ class UsersViewsTest(TestCase):
         }
         self.assertEqual(response.json(), test_json)
 
+    def test_get_users_list_without_count(self):
+        """Список пользователей без подсчета общего количества."""
+        User.objects.bulk_create(
+            User(username=f"user_{index}", email=f"user_{index}@mail.com")
+            for index in range(5)
+        )
+        limit = 2
+        for page in (1, 2):
+            url = f"/api/users/?limit={limit}&count=0&page={page}"
+            with self.subTest(page=page):
+                response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                data = response.json()
+                # only one row past the page is read, never the total
+                offset = (page - 1) * limit
+                self.assertEqual(data["count"], offset + limit + 1)
+                self.assertLess(data["count"], User.objects.count())
+                self.assertEqual(len(data["results"]), limit)
+                self.assertIn(f"page={page + 1}", data["next"])
+
     def test_create_user(self):
         """Регистрация пользователя."""
         url = "/api/users/"